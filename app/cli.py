@@ -0,0 +1,384 @@
+"""
+Comandos de manutenção do Security Key
+
+    python -m app.cli rewrap --batch-size 500 --checkpoint rewrap.json
+    python -m app.cli derivar-chave [--id ID] [--perguntar]
+    python -m app.cli reindexar-busca
+    python -m app.cli bench-serializacao [--itens 100] [--campos 6] [--repeticoes 100]
+    python -m app.cli bench-cripto [--valores 1000] [--repeticoes 20]
+    python -m app.cli bench-carregamento [--itens 500] [--campos 15] [--rodadas 5]
+    python -m app.cli bench-token [--repeticoes 5000]
+    python -m app.cli bench-carga --url http://127.0.0.1:8000 [--clientes 500] [--requisicoes 10]
+"""
+import argparse
+import base64
+import getpass
+import os
+import tempfile
+import time
+import timeit
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import Base, SessionLocal, engine
+from app.services.crypto import CIFRAS, CryptoService
+from app.services.keyring import CHAVE_PADRAO, KeyRing, derivar_chave
+from app.services.rewrap import Checkpoint, rewrap_campos
+from app.services.search import SearchService
+from app.services import serializacao
+
+settings = get_settings()
+
+
+def cmd_rewrap(args):
+    """Regrava os campos sensíveis no formato e chave atuais"""
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    inicio = checkpoint.carregar() if checkpoint else None
+    if inicio and inicio.ultimo_id:
+        print(f"↪️  Retomando após o id {inicio.ultimo_id} ({inicio.lidos} já lidos)")
+    
+    def ao_concluir_lote(resultado):
+        if checkpoint:
+            checkpoint.salvar(resultado)
+        print(f"   {resultado.lidos} lidos, {resultado.convertidos} convertidos", flush=True)
+    
+    db = SessionLocal()
+    try:
+        resultado = rewrap_campos(
+            db,
+            batch_size=args.batch_size,
+            pausa=args.pausa,
+            criptografar_texto_puro=args.criptografar_texto_puro,
+            inicio=inicio,
+            ao_concluir_lote=ao_concluir_lote
+        )
+    finally:
+        db.close()
+    
+    print(
+        f"✅ Reempacotamento concluído: {resultado.lidos} lidos, "
+        f"{resultado.convertidos} convertidos, {resultado.ignorados} ignorados"
+    )
+
+
+def cmd_derivar_chave(args):
+    """Imprime uma chave já derivada, no formato de ENCRYPTION_KEYS"""
+    segredo = getpass.getpass("Segredo: ") if args.perguntar else settings.ENCRYPTION_KEY
+    material = derivar_chave(segredo)
+    print(f"{args.id}:{base64.urlsafe_b64encode(material).decode()}")
+
+
+def cmd_reindexar_busca(args):
+    """Reconstrói o índice de busca"""
+    SearchService.inicializar(engine)
+    total = SearchService.reindexar_tudo(engine)
+    print(f"✅ Índice de busca ({SearchService.modo}) reconstruído: {total} itens")
+
+
+def cmd_bench_serializacao(args):
+    """Mede o tempo de serialização de uma página de itens em cada modo"""
+    from app.models.campo_dinamico import CampoDinamico
+    from app.models.categoria import Categoria
+    from app.models.item_cofre import ItemCofre
+    
+    agora = datetime.utcnow()
+    categoria = Categoria(id="c", nome="Bancos", icone="bank", cor="#10b981", created_at=agora, updated_at=agora)
+    pagina = []
+    for i in range(args.itens):
+        item = ItemCofre(
+            id=f"item-{i}", user_id="u", titulo=f"Item {i}", category_id="c", favorito=False,
+            nota_adicional="Observação", created_at=agora, updated_at=agora, categoria=categoria,
+            campos=[
+                CampoDinamico(
+                    id=f"campo-{i}-{j}", item_id=f"item-{i}", label=f"Campo {j}", value=f"valor {j}",
+                    field_type="texto", is_sensitive=j % 2 == 0, ordem=str(j),
+                    created_at=agora, updated_at=agora
+                )
+                for j in range(args.campos)
+            ]
+        )
+        item.dono_nome = "Você"
+        item.pode_editar = True
+        pagina.append(item)
+    
+    encoder = "orjson" if serializacao.orjson is not None else "pydantic-core"
+    print(
+        f"Página de {args.itens} itens com {args.campos} campos "
+        f"(melhor de {args.rodadas} rodadas de {args.repeticoes}, encoder {encoder})"
+    )
+    tempos = {}
+    for modo in ("pydantic", "fast"):
+        settings.ITENS_SERIALIZER = modo
+        corpo = serializacao.Serializador.itens(pagina)
+        rodadas = timeit.repeat(
+            lambda: serializacao.Serializador.itens(pagina),
+            number=args.repeticoes,
+            repeat=args.rodadas
+        )
+        tempos[modo] = min(rodadas) / args.repeticoes * 1000
+        print(f"   {modo:<9} {tempos[modo]:8.3f} ms/página  ({len(corpo)} bytes)")
+    print(f"✅ fast {tempos['pydantic'] / tempos['fast']:.1f}x mais rápido")
+
+
+def cmd_bench_cripto(args):
+    """
+    Mede a criptografia de uma página de valores: o caminho legado, um valor por vez
+    (base64 externo sobre o token Fernet), contra encrypt_many/decrypt_many
+    no formato atual, com cada cifra.
+    """
+    KeyRing.carregar()
+    fernet = KeyRing.get(CHAVE_PADRAO).fernet
+    valores = [f"senha-{i:06d}" for i in range(args.valores)]
+    
+    def encrypt_legado(valor):
+        return base64.urlsafe_b64encode(fernet.encrypt(valor.encode())).decode()
+    
+    def decrypt_legado(valor):
+        try:
+            return fernet.decrypt(base64.urlsafe_b64decode(valor.encode())).decode()
+        except Exception:
+            return valor
+    
+    def encrypt_many(cifra):
+        settings.CRYPTO_CIPHER = cifra
+        return CryptoService.encrypt_many(valores)
+    
+    legados = [encrypt_legado(valor) for valor in valores]
+    casos = {
+        "encrypt legado": lambda: [encrypt_legado(valor) for valor in valores],
+        "decrypt legado": lambda: [decrypt_legado(valor) for valor in legados],
+    }
+    for cifra in CIFRAS:
+        cifrados = encrypt_many(cifra)
+        assert CryptoService.decrypt_many(cifrados) == valores
+        casos[f"encrypt_many {cifra}"] = lambda cifra=cifra: encrypt_many(cifra)
+        casos[f"decrypt_many {cifra}"] = lambda cifrados=cifrados: CryptoService.decrypt_many(cifrados)
+    
+    print(f"Página de {args.valores} valores (melhor de {args.rodadas} rodadas de {args.repeticoes})")
+    tempos = {}
+    for nome, funcao in casos.items():
+        rodadas = timeit.repeat(funcao, number=args.repeticoes, repeat=args.rodadas)
+        tempos[nome] = min(rodadas) / args.repeticoes * 1000
+        print(f"   {nome:<21} {tempos[nome]:8.3f} ms/página")
+    for cifra in CIFRAS:
+        print(
+            f"✅ {cifra}: decrypt {tempos['decrypt legado'] / tempos[f'decrypt_many {cifra}']:.1f}x, "
+            f"encrypt {tempos['encrypt legado'] / tempos[f'encrypt_many {cifra}']:.1f}x o legado"
+        )
+
+
+def cmd_bench_carregamento(args):
+    """
+    Mede a listagem de itens com os campos por JOIN e por selectinload,
+    em um banco SQLite temporário (o banco configurado não é usado).
+    """
+    from app.models.campo_dinamico import CampoDinamico
+    from app.models.item_cofre import ItemCofre
+    from app.models.usuario import Usuario
+    from app.routers.itens import opcoes_carregamento
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        bench_engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.db')}")
+        Base.metadata.create_all(bench_engine)
+        with Session(bench_engine) as db:
+            db.add(Usuario(id="u", nome="Bench", email="bench@local", password_hash="-"))
+            for i in range(args.itens):
+                db.add(ItemCofre(id=f"item-{i:05d}", user_id="u", titulo=f"Item {i}"))
+                db.add_all(
+                    CampoDinamico(
+                        item_id=f"item-{i:05d}", label=f"Campo {j}", value=f"valor {j}",
+                        ordem=str(j)
+                    )
+                    for j in range(args.campos)
+                )
+            db.commit()
+        
+        def listar():
+            with Session(bench_engine) as db:
+                return db.scalars(
+                    select(ItemCofre).options(*opcoes_carregamento())
+                    .where(ItemCofre.user_id == "u")
+                    .order_by(ItemCofre.titulo)
+                ).unique().all()
+        
+        print(f"{args.itens} itens com {args.campos} campos, SQLite (melhor de {args.rodadas} rodadas)")
+        for modo in ("joined", "selectin"):
+            settings.ITENS_CAMPOS_LOADING = modo
+            assert sum(len(item.campos) for item in listar()) == args.itens * args.campos
+            rodadas = timeit.repeat(listar, number=1, repeat=args.rodadas)
+            print(f"   {modo:<9} {min(rodadas) * 1000:8.1f} ms")
+        bench_engine.dispose()
+
+
+def cmd_bench_token(args):
+    """Mede a validação de um JWT sem o cache de tokens e com ele"""
+    from app.services.auth import AuthService, token_cache
+    
+    token = AuthService.create_access_token({"sub": "u", "email": "bench@local"})
+    
+    def sem_cache():
+        token_cache.clear()
+        return AuthService.decode_token(token)
+    
+    print(f"Mesmo token, {args.repeticoes} validações (melhor de {args.rodadas} rodadas)")
+    for nome, funcao in (("sem cache", sem_cache), ("com cache", lambda: AuthService.decode_token(token))):
+        assert funcao() is not None
+        rodadas = timeit.repeat(funcao, number=args.repeticoes, repeat=args.rodadas)
+        print(f"   {nome:<10} {min(rodadas) / args.repeticoes * 1e6:8.1f} us/validação")
+
+
+def cmd_bench_carga(args):
+    """
+    Teste de carga contra um servidor em execução (uvicorn): clientes concorrentes
+    repetem um GET com um usuário criado para o teste. Mostra vazão, p50, p99 e
+    erros; com --metrics-token, as conexões do pool usadas por requisição.
+    """
+    import asyncio
+    
+    import httpx
+    
+    async def carga():
+        limites = httpx.Limits(max_connections=args.clientes)
+        async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limites) as client:
+            email = f"carga-{time.time_ns()}@example.com"
+            r = await client.post("/api/auth/registro", json={"nome": "Carga", "email": email, "password": "senha123"})
+            r.raise_for_status()
+            r = await client.post("/api/auth/login", data={"username": email, "password": "senha123"})
+            r.raise_for_status()
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            ids = []
+            for i in range(args.itens):
+                r = await client.post("/api/itens", headers=headers, json={
+                    "titulo": f"Item {i}",
+                    "campos": [{"label": "Senha", "value": f"senha{i}", "is_sensitive": True}]
+                })
+                r.raise_for_status()
+                ids.append(r.json()["id"])
+            rota = args.rota.format(item_id=ids[0] if ids else "")
+            
+            async def checkouts():
+                if not args.metrics_token:
+                    return None
+                r = await client.get("/metrics", headers={"X-Metrics-Token": args.metrics_token})
+                r.raise_for_status()
+                return r.json().get("db.async.checkouts")
+            
+            latencias = []
+            erros = 0
+            
+            async def cliente():
+                nonlocal erros
+                for _ in range(args.requisicoes):
+                    inicio = time.perf_counter()
+                    try:
+                        ok = (await client.get(rota, headers=headers)).status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    latencias.append(time.perf_counter() - inicio)
+                    erros += not ok
+            
+            antes = await checkouts()
+            inicio = time.perf_counter()
+            await asyncio.gather(*(cliente() for _ in range(args.clientes)))
+            duracao = time.perf_counter() - inicio
+            depois = await checkouts()
+        
+        latencias.sort()
+        
+        def percentil(p: float) -> float:
+            return latencias[min(int(len(latencias) * p), len(latencias) - 1)] * 1000
+        
+        print(f"{args.clientes} clientes x {args.requisicoes} GET {rota} em {args.url}")
+        print(
+            f"   {len(latencias) / duracao:8.0f} req/s   p50 {percentil(0.5):8.1f} ms   "
+            f"p99 {percentil(0.99):8.1f} ms   máx {latencias[-1] * 1000:8.1f} ms   erros {erros}"
+        )
+        if antes is not None and depois is not None:
+            print(f"   {(depois - antes) / len(latencias):8.2f} conexões do pool por requisição")
+    
+    asyncio.run(carga())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do Security Key")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    
+    rewrap = subparsers.add_parser("rewrap", help="Converte campos sensíveis para o formato atual")
+    rewrap.add_argument("--batch-size", type=int, default=500, help="Campos por lote")
+    rewrap.add_argument("--pausa", type=float, default=0.0, help="Segundos de espera entre lotes")
+    rewrap.add_argument(
+        "--criptografar-texto-puro",
+        action="store_true",
+        help="Criptografa também os valores sensíveis gravados sem criptografia"
+    )
+    rewrap.add_argument("--checkpoint", help="Arquivo de progresso (retoma se já existir)")
+    rewrap.set_defaults(func=cmd_rewrap)
+    
+    derivar = subparsers.add_parser("derivar-chave", help="Gera uma entrada de ENCRYPTION_KEYS")
+    derivar.add_argument("--id", default=CHAVE_PADRAO, help="Id da chave")
+    derivar.add_argument(
+        "--perguntar",
+        action="store_true",
+        help="Lê o segredo do terminal em vez de usar ENCRYPTION_KEY"
+    )
+    derivar.set_defaults(func=cmd_derivar_chave)
+    
+    reindexar = subparsers.add_parser("reindexar-busca", help="Reconstrói o índice de busca")
+    reindexar.set_defaults(func=cmd_reindexar_busca)
+    
+    bench = subparsers.add_parser("bench-serializacao", help="Mede a serialização de uma página de itens")
+    bench.add_argument("--itens", type=int, default=100, help="Itens por página")
+    bench.add_argument("--campos", type=int, default=6, help="Campos por item")
+    bench.add_argument("--repeticoes", type=int, default=100, help="Serializações por rodada")
+    bench.add_argument("--rodadas", type=int, default=5, help="Rodadas por modo (vale a melhor)")
+    bench.set_defaults(func=cmd_bench_serializacao)
+    
+    cripto = subparsers.add_parser(
+        "bench-cripto",
+        help="Mede a criptografia de uma página no formato legado e no atual"
+    )
+    cripto.add_argument("--valores", type=int, default=1000, help="Valores por página")
+    cripto.add_argument("--repeticoes", type=int, default=20, help="Páginas por rodada")
+    cripto.add_argument("--rodadas", type=int, default=5, help="Rodadas por caso (vale a melhor)")
+    cripto.set_defaults(func=cmd_bench_cripto)
+    
+    carregamento = subparsers.add_parser(
+        "bench-carregamento",
+        help="Mede a listagem de itens com os campos por JOIN e por selectinload"
+    )
+    carregamento.add_argument("--itens", type=int, default=500, help="Itens do usuário")
+    carregamento.add_argument("--campos", type=int, default=15, help="Campos por item")
+    carregamento.add_argument("--rodadas", type=int, default=5, help="Rodadas por modo (vale a melhor)")
+    carregamento.set_defaults(func=cmd_bench_carregamento)
+    
+    token = subparsers.add_parser("bench-token", help="Mede a validação de JWT com e sem cache")
+    token.add_argument("--repeticoes", type=int, default=5000, help="Validações por rodada")
+    token.add_argument("--rodadas", type=int, default=5, help="Rodadas por modo (vale a melhor)")
+    token.set_defaults(func=cmd_bench_token)
+    
+    carga = subparsers.add_parser(
+        "bench-carga",
+        help="Teste de carga (p50/p99) contra um servidor em execução"
+    )
+    carga.add_argument("--url", required=True, help="Endereço do servidor (ex.: http://127.0.0.1:8000)")
+    carga.add_argument("--clientes", type=int, default=500, help="Clientes concorrentes")
+    carga.add_argument("--requisicoes", type=int, default=10, help="Requisições por cliente")
+    carga.add_argument(
+        "--rota",
+        default="/api/itens",
+        help="Rota medida ({item_id} é trocado pelo primeiro item criado)"
+    )
+    carga.add_argument("--itens", type=int, default=20, help="Itens criados para o usuário do teste")
+    carga.add_argument("--timeout", type=float, default=120.0, help="Segundos de espera por resposta")
+    carga.add_argument("--metrics-token", help="METRICS_TOKEN do servidor (conexões por requisição)")
+    carga.set_defaults(func=cmd_bench_carga)
+    
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
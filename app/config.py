@@ -16,17 +16,83 @@ class Settings(BaseSettings):
     APP_NAME: str = os.getenv("APP_NAME", "Security Key")
     APP_VERSION: str = os.getenv("APP_VERSION", "1.0.0")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() in ["true", "1", "t"]
+    # Token exigido em /metrics (header X-Metrics-Token); vazio desliga o endpoint
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
     
     # Banco de dados
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # URL com driver assíncrono usada pelas rotas (vazio: derivada da DATABASE_URL)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    
+    # Réplicas de leitura (URLs separadas por vírgula) e por quantos segundos
+    # as leituras de um usuário continuam no primário após ele gravar algo
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_STICKY_SECONDS: int = os.getenv("REPLICA_STICKY_SECONDS", 10)
+    
+    # Pool de conexões (por engine)
+    DB_POOL_SIZE: int = os.getenv("DB_POOL_SIZE", 5)
+    DB_MAX_OVERFLOW: int = os.getenv("DB_MAX_OVERFLOW", 10)
+    DB_POOL_TIMEOUT: int = os.getenv("DB_POOL_TIMEOUT", 30)
+    DB_POOL_RECYCLE: int = os.getenv("DB_POOL_RECYCLE", 1800)
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "False").lower() in ["true", "1", "t"]
+    
+    # SQLite: pragmas aplicados em cada conexão nova
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT: int = os.getenv("SQLITE_BUSY_TIMEOUT", 5000)
+    
+    # Carregamento dos campos nas listagens de itens: "selectin" ou "joined"
+    ITENS_CAMPOS_LOADING: str = os.getenv("ITENS_CAMPOS_LOADING", "selectin")
+    # JSON das listagens de itens: "fast" (direto dos objetos) ou "pydantic" (valida pelo schema)
+    ITENS_SERIALIZER: str = os.getenv("ITENS_SERIALIZER", "fast")
+    
+    # Sincronização: segundos repetidos a cada token, para gravações confirmadas com atraso
+    SYNC_OVERLAP_SECONDS: int = os.getenv("SYNC_OVERLAP_SECONDS", 5)
+    
+    # Exportação (/api/itens/export): itens lidos, descriptografados e enviados por bloco
+    EXPORT_CHUNK_SIZE: int = os.getenv("EXPORT_CHUNK_SIZE", 500)
     
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
     
+    # Hash de senhas: custo do bcrypt, threads dedicadas e fila máxima de espera
+    BCRYPT_ROUNDS: int = os.getenv("BCRYPT_ROUNDS", 12)
+    PASSWORD_HASH_WORKERS: int = os.getenv("PASSWORD_HASH_WORKERS", 2)
+    PASSWORD_HASH_QUEUE: int = os.getenv("PASSWORD_HASH_QUEUE", 32)
+    
+    # Cache de tokens já verificados (segundos / entradas; 0 desliga)
+    TOKEN_CACHE_TTL: int = os.getenv("TOKEN_CACHE_TTL", 300)
+    TOKEN_CACHE_SIZE: int = os.getenv("TOKEN_CACHE_SIZE", 10000)
+    
+    # Cache de usuários autenticados (segundos / entradas; 0 desliga)
+    USER_CACHE_TTL: int = os.getenv("USER_CACHE_TTL", 30)
+    USER_CACHE_SIZE: int = os.getenv("USER_CACHE_SIZE", 1000)
+    
+    # Mapa de acesso aos itens de cada usuário (segundos / usuários; 0 desliga)
+    # Acessos por compartilhamento conferem o carimbo das permissões no máximo
+    # a cada ACL_CONFERENCIA_SEGUNDOS (0 confere em toda decisão)
+    ACL_CACHE_TTL: int = os.getenv("ACL_CACHE_TTL", 30)
+    ACL_CACHE_SIZE: int = os.getenv("ACL_CACHE_SIZE", 1000)
+    ACL_CONFERENCIA_SEGUNDOS: int = os.getenv("ACL_CONFERENCIA_SEGUNDOS", 2)
+    
+    # Cache da lista de categorias: globais lidas uma vez, próprias por usuário
+    # (segundos / usuários; 0 desliga)
+    CATEGORIAS_CACHE_TTL: int = os.getenv("CATEGORIAS_CACHE_TTL", 60)
+    CATEGORIAS_CACHE_SIZE: int = os.getenv("CATEGORIAS_CACHE_SIZE", 1000)
+    
+    # Cache de páginas de itens já descriptografadas (segundos / páginas; 0 desliga, o padrão)
+    ITENS_PAGE_CACHE_TTL: int = os.getenv("ITENS_PAGE_CACHE_TTL", 15)
+    ITENS_PAGE_CACHE_SIZE: int = os.getenv("ITENS_PAGE_CACHE_SIZE", 0)
+    
     # Criptografia de campos sensíveis
     ENCRYPTION_KEY: str = os.getenv("ENCRYPTION_KEY", "")
+    # Chaves já derivadas ("id:base64,id:base64") e id da chave das novas gravações
+    ENCRYPTION_KEYS: str = os.getenv("ENCRYPTION_KEYS", "")
+    ENCRYPTION_PRIMARY_KEY_ID: str = os.getenv("ENCRYPTION_PRIMARY_KEY_ID", "0")
+    # Cifra usada nas novas gravações: "fernet" ou "aesgcm"
+    CRYPTO_CIPHER: str = os.getenv("CRYPTO_CIPHER", "fernet")
     
     class Config:
         env_file = ".env"
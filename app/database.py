@@ -1,38 +1,216 @@
 """
 Configuração do banco de dados SQLAlchemy
+
+As rotas usam o engine assíncrono (AsyncSession); o engine síncrono fica
+para a subida da aplicação e os comandos de manutenção (app.cli).
+Réplicas de leitura, se configuradas, atendem as rotas de consulta
+(ver app.services.replicas).
 """
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.config import get_settings
 
 settings = get_settings()
 
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Driver assíncrono correspondente a cada banco
+DRIVERS_ASYNC = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def url_assincrona(url: str) -> str:
+    """Troca o driver da URL pelo equivalente assíncrono"""
+    url = make_url(url)
+    driver = DRIVERS_ASYNC.get(url.get_backend_name())
+    if driver is None:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _pool_medido(base: type) -> type:
+    """
+    Pool que conta as esperas por uma conexão: quantidade, tempo total
+    e quantas estouraram o DB_POOL_TIMEOUT.
+    Os contadores ficam na classe, preservados quando o pool é recriado.
+    """
+    class PoolMedido(base):
+        _lock_estatisticas = threading.Lock()
+        checkouts = 0
+        wait_us = 0
+        wait_timeouts = 0
+        
+        def connect(self):
+            inicio = time.perf_counter()
+            estourou = False
+            try:
+                return super().connect()
+            except PoolTimeoutError:
+                estourou = True
+                raise
+            finally:
+                espera = int((time.perf_counter() - inicio) * 1_000_000)
+                cls = type(self)
+                with cls._lock_estatisticas:
+                    cls.checkouts += 1
+                    cls.wait_us += espera
+                    cls.wait_timeouts += estourou
+    
+    PoolMedido.__name__ = f"{base.__name__}Medido"
+    return PoolMedido
+
+
+def _sqlite_em_memoria(url: str) -> bool:
+    """SQLite em memória usa um pool próprio (uma conexão), sem ajustes"""
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def opcoes_pool(url: str, base: type) -> dict:
+    """Argumentos de pool do create_engine, conforme as configurações"""
+    if _sqlite_em_memoria(url):
+        return {}
+    
+    return {
+        "poolclass": _pool_medido(base),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def configurar_sqlite(engine: Engine) -> None:
+    """Aplica os pragmas do SQLite em cada conexão nova"""
+    if engine.dialect.name != "sqlite" or _sqlite_em_memoria(str(engine.url)):
+        return
+    
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE inválido: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in SQLITE_SYNCHRONOUS:
+        raise ValueError(f"SQLITE_SYNCHRONOUS inválido: {settings.SQLITE_SYNCHRONOUS}")
+    busy_timeout = int(settings.SQLITE_BUSY_TIMEOUT)
+    
+    @event.listens_for(engine, "connect")
+    def _pragmas_sqlite(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+
+def estatisticas_pool(engine: Engine) -> Dict[str, int]:
+    """
+    Estado do pool do engine: conexões em uso, além do pool_size,
+    e as esperas acumuladas (quantidade, microssegundos, timeouts).
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": getattr(pool, "checkouts", 0),
+        "wait_us": getattr(pool, "wait_us", 0),
+        "wait_timeouts": getattr(pool, "wait_timeouts", 0),
+    }
+
+
 # Criar engine do SQLAlchemy
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
-    echo=settings.DEBUG
+    echo=settings.DEBUG,
+    **opcoes_pool(settings.DATABASE_URL, QueuePool)
 )
+configurar_sqlite(engine)
 
 # Criar SessionLocal para gerenciar sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def engine_assincrono(url: str) -> AsyncEngine:
+    """Cria um engine assíncrono com o pool e os pragmas configurados"""
+    novo = create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        **opcoes_pool(url, AsyncAdaptedQueuePool)
+    )
+    configurar_sqlite(novo.sync_engine)
+    return novo
+
+
+def fabrica_sessoes(async_engine: AsyncEngine) -> async_sessionmaker:
+    """
+    Fábrica de sessões assíncronas do engine.
+    Objetos continuam carregados após o commit: a resposta é montada sem nova consulta.
+    """
+    return async_sessionmaker(
+        async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+# Engine e sessões assíncronas, usados pelas rotas
+async_engine = engine_assincrono(
+    settings.ASYNC_DATABASE_URL or url_assincrona(settings.DATABASE_URL)
+)
+AsyncSessionLocal = fabrica_sessoes(async_engine)
+
+# Réplicas de leitura, na ordem de DATABASE_REPLICA_URLS
+replica_engines = [
+    engine_assincrono(url_assincrona(url.strip()))
+    for url in settings.DATABASE_REPLICA_URLS.split(",")
+    if url.strip()
+]
+ReplicaSessions = [fabrica_sessoes(replica) for replica in replica_engines]
+
 # Base para os modelos
 Base = declarative_base()
 
 
-def get_db():
+async def get_db():
     """
-    Dependency que fornece uma sessão do banco de dados.
+    Dependency que fornece uma sessão assíncrona do banco de dados.
     Garante que a sessão seja fechada após o uso.
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def create_tables():
-    """Cria todas as tabelas no banco de dados"""
+    """
+    Cria todas as tabelas no banco de dados.
+    Índices novos também são criados em tabelas que já existiam.
+    """
     Base.metadata.create_all(bind=engine)
+    
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
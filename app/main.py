@@ -3,17 +3,31 @@ Security Key - Cofre Digital Familiar
 API FastAPI para gerenciar senhas e documentos da família
 """
 
+import hmac
 import os
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.config import get_settings
-from app.database import create_tables
+from app.database import (
+    async_engine,
+    create_tables,
+    engine,
+    estatisticas_pool,
+    replica_engines,
+)
+from app.services.cache_categorias import CacheCategorias
+from app.services.cache_paginas import CachePaginas
+from app.services.keyring import KeyRing
+from app.services.metrics import Metrics
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.services.replicas import ESCRITA_HEADER, marcar_escrita_resposta
+from app.services.search import SearchService
 from app.routers import (
     auth_router,
     campos_router,
@@ -25,6 +39,14 @@ from app.routers import (
 
 settings = get_settings()
 
+# Estado dos pools de conexão em /metrics
+Metrics.registrar_fonte("db.sync", lambda: estatisticas_pool(engine))
+Metrics.registrar_fonte("db.async", lambda: estatisticas_pool(async_engine.sync_engine))
+for _indice, _replica in enumerate(replica_engines):
+    Metrics.registrar_fonte(
+        f"db.replica{_indice}", lambda replica=_replica: estatisticas_pool(replica.sync_engine)
+    )
+
 # Diretório base da aplicação
 BASE_DIR = Path(__file__).resolve().parent
 
@@ -35,9 +57,14 @@ async def lifespan(app: FastAPI):
     Gerencia o ciclo de vida da aplicação.
     Cria as tabelas no início e limpa recursos no final.
     """
-    # Startup: Cria tabelas
+    # Startup: Carrega as chaves de criptografia (evita o PBKDF2 na primeira requisição)
+    KeyRing.carregar()
+    print(f"✅ Chaves de criptografia carregadas: {', '.join(KeyRing.ids())}")
+
+    # Cria tabelas
     create_tables()
-    print("✅ Banco de dados inicializado")
+    SearchService.inicializar(engine)
+    print(f"✅ Banco de dados inicializado (busca: {SearchService.modo})")
 
     # Cria categorias padrão
     from app.database import SessionLocal
@@ -104,13 +131,18 @@ async def lifespan(app: FastAPI):
                 categoria = Categoria(**cat_data)
                 db.add(categoria)
         db.commit()
+        CacheCategorias.recarregar_globais()
         print("✅ Categorias padrão criadas")
     finally:
         db.close()
 
     yield
 
-    # Shutdown
+    # Shutdown: zera as páginas descriptografadas ainda em memória
+    CachePaginas.limpar()
+    await async_engine.dispose()
+    for replica in replica_engines:
+        await replica.dispose()
     print("👋 Encerrando aplicação...")
 
 
@@ -144,8 +176,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, ESCRITA_HEADER],
 )
 
+# Com réplicas, as gravações informam ao cliente o instante da escrita
+if replica_engines:
+    app.middleware("http")(marcar_escrita_resposta)
+
 # Monta arquivos estáticos
 app.mount("/static/", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
@@ -199,3 +236,22 @@ def health_check():
     Health check da aplicação
     """
     return {"status": "healthy"}
+
+
+def exigir_token_metricas(x_metrics_token: str = Header(None)) -> None:
+    """
+    Acesso interno às métricas: exige o header X-Metrics-Token igual a METRICS_TOKEN.
+    Sem METRICS_TOKEN configurado, o endpoint fica desligado (404).
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_metrics_token or not hmac.compare_digest(x_metrics_token, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+
+
+@app.get("/metrics", tags=["Health"], dependencies=[Depends(exigir_token_metricas)])
+def metrics():
+    """
+    Contadores internos deste processo (header X-Metrics-Token)
+    """
+    return Metrics.snapshot()
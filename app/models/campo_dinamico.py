@@ -2,7 +2,7 @@
 Modelo de Campo Dinâmico - Campos flexíveis para cada item
 """
 from enum import Enum
-from sqlalchemy import Column, String, Boolean, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, ForeignKey, Index, Text, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import TimestampMixin, generate_uuid
@@ -29,6 +29,15 @@ class CampoDinamico(Base, TimestampMixin):
     Ex: Agência/Conta, Data de Emissão, Usuário, Senha, CPF, etc.
     """
     __tablename__ = "campos_dinamicos"
+    __table_args__ = (
+        # Campos ativos de um item, na ordem de exibição
+        Index(
+            "ix_campos_dinamicos_item_ativos",
+            "item_id", "ordem",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
     
     id = Column(
         String(36), 
@@ -1,7 +1,7 @@
 """
 Modelo de Categoria - Organização dos itens
 """
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import TimestampMixin, generate_uuid
@@ -13,6 +13,15 @@ class Categoria(Base, TimestampMixin):
     Ex: "Banco", "Rede Social", "Documentos", "Saúde"
     """
     __tablename__ = "categorias"
+    __table_args__ = (
+        # Categorias globais (usuario_id NULL) e do usuário, por nome
+        Index(
+            "ix_categorias_usuario_ativas",
+            "usuario_id", "nome",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
     
     id = Column(
         String(36), 
@@ -1,7 +1,7 @@
 """
 Modelo de Item do Cofre - Registro principal de informações
 """
-from sqlalchemy import Column, String, Boolean, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, ForeignKey, Index, Text, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import TimestampMixin, generate_uuid
@@ -13,6 +13,17 @@ class ItemCofre(Base, TimestampMixin):
     Cada item pode ter múltiplos campos dinâmicos associados.
     """
     __tablename__ = "itens_cofre"
+    __table_args__ = (
+        # Listagem dos itens do dono, já na ordem da tela (favoritos primeiro)
+        Index(
+            "ix_itens_cofre_user_ativos",
+            "user_id", "favorito", "titulo",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # Sincronização: itens do dono alterados ou excluídos desde um instante
+        Index("ix_itens_cofre_user_updated", "user_id", "updated_at"),
+    )
     
     id = Column(
         String(36), 
@@ -70,7 +81,7 @@ class ItemCofre(Base, TimestampMixin):
         "CampoDinamico",
         back_populates="item",
         cascade="all, delete-orphan",
-        lazy="joined"
+        lazy="selectin"
     )
     
     permissoes = relationship(
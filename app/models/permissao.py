@@ -2,7 +2,7 @@
 Modelo de Permissão - Compartilhamento entre familiares
 """
 from enum import Enum
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import TimestampMixin, generate_uuid
@@ -20,6 +20,18 @@ class Permissao(Base, TimestampMixin):
     Define quem pode ver ou editar cada item.
     """
     __tablename__ = "permissoes"
+    __table_args__ = (
+        # Itens compartilhados com um usuário e verificação de acesso (destino + item)
+        Index(
+            "ix_permissoes_destino_ativas",
+            "shared_with_user_id", "item_id",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        # Sincronização: compartilhamentos recebidos e dos itens do dono alterados desde um instante
+        Index("ix_permissoes_destino_updated", "shared_with_user_id", "updated_at"),
+        Index("ix_permissoes_updated", "updated_at"),
+    )
     
     id = Column(
         String(36), 
@@ -1,7 +1,7 @@
 """
 Modelo de Usuário - Quem acessa o app
 """
-from sqlalchemy import Column, String, Boolean
+from sqlalchemy import Column, String, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 from app.models.base import TimestampMixin, generate_uuid
@@ -13,6 +13,15 @@ class Usuario(Base, TimestampMixin):
     Armazena quem são as pessoas que acessam o app.
     """
     __tablename__ = "usuarios"
+    __table_args__ = (
+        # Listagem de usuários por nome (paginação por nome, id)
+        Index(
+            "ix_usuarios_nome_ativos",
+            "nome", "id",
+            sqlite_where=text("deleted_at IS NULL"),
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
     
     id = Column(
         String(36), 
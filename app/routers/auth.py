@@ -4,13 +4,18 @@ Router de Autenticação - Login, Registro, Perfil
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioCreate, UsuarioResponse, UsuarioUpdate
 from app.schemas.auth import Token
-from app.services.auth import AuthService, get_current_active_user
+from app.services.auth import (
+    AuthService,
+    PasswordHasher,
+    get_current_active_user,
+)
 from app.config import get_settings
 
 settings = get_settings()
@@ -18,15 +23,15 @@ router = APIRouter(prefix="/api/auth", tags=["Autenticação"])
 
 
 @router.post("/registro", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
-def registrar_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
+async def registrar_usuario(usuario: UsuarioCreate, db: AsyncSession = Depends(get_db)):
     """
     Registra um novo usuário no sistema.
     """
     # Verifica se email já existe
-    existing = db.query(Usuario).filter(
+    existing = await db.scalar(select(Usuario).where(
         Usuario.email == usuario.email,
         Usuario.deleted_at.is_(None)
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -38,26 +43,25 @@ def registrar_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
     db_user = Usuario(
         nome=usuario.nome,
         email=usuario.email,
-        password_hash=AuthService.get_password_hash(usuario.password)
+        password_hash=await PasswordHasher.hash(usuario.password)
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
     return db_user
 
 
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Autentica usuário e retorna token JWT.
     Use o email como username.
     """
-    user = AuthService.authenticate_user(db, form_data.username, form_data.password)
+    user = await AuthService.authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -83,7 +87,7 @@ def login(
 
 
 @router.get("/me", response_model=UsuarioResponse)
-def get_perfil(current_user: Usuario = Depends(get_current_active_user)):
+async def get_perfil(current_user: Usuario = Depends(get_current_active_user)):
     """
     Retorna os dados do usuário autenticado.
     """
@@ -91,21 +95,21 @@ def get_perfil(current_user: Usuario = Depends(get_current_active_user)):
 
 
 @router.put("/me", response_model=UsuarioResponse)
-def atualizar_perfil(
+async def atualizar_perfil(
     dados: UsuarioUpdate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualiza os dados do usuário autenticado.
     """
     # Verifica se novo email já existe
     if dados.email and dados.email != current_user.email:
-        existing = db.query(Usuario).filter(
+        existing = await db.scalar(select(Usuario).where(
             Usuario.email == dados.email,
             Usuario.deleted_at.is_(None),
             Usuario.id != current_user.id
-        ).first()
+        ))
         
         if existing:
             raise HTTPException(
@@ -119,9 +123,9 @@ def atualizar_perfil(
     if dados.email is not None:
         current_user.email = dados.email
     if dados.password is not None:
-        current_user.password_hash = AuthService.get_password_hash(dados.password)
+        current_user.password_hash = await PasswordHasher.hash(dados.password)
     
-    db.commit()
-    db.refresh(current_user)
+    # O cache do usuário é invalidado após o commit (ver services/auth.py)
+    await db.commit()
     
     return current_user
@@ -3,80 +3,64 @@ Router de Campos Dinâmicos - CRUD
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.usuario import Usuario
-from app.models.item_cofre import ItemCofre
 from app.models.campo_dinamico import CampoDinamico
-from app.models.permissao import Permissao, NivelAcesso
 from app.schemas.campo_dinamico import (
     CampoDinamicoCreate,
     CampoDinamicoUpdate,
     CampoDinamicoResponse
 )
+from app.services.acl import AclService
 from app.services.auth import get_current_active_user
+from app.services.cache_paginas import CachePaginas
 from app.services.crypto import CryptoService
+from app.services.search import SearchService
+from app.services.sync import SyncService
 
 router = APIRouter(prefix="/api/itens/{item_id}/campos", tags=["Campos Dinâmicos"])
 
 
-def check_edit_access(db: Session, item_id: str, user_id: str) -> bool:
-    """Verifica se o usuário pode editar o item"""
-    # É o dono?
-    item = db.query(ItemCofre).filter(
-        ItemCofre.id == item_id,
-        ItemCofre.user_id == user_id,
-        ItemCofre.deleted_at.is_(None)
-    ).first()
-    
-    if item:
-        return True
-    
-    # Tem permissão de edição?
-    permissao = db.query(Permissao).filter(
-        Permissao.item_id == item_id,
-        Permissao.shared_with_user_id == user_id,
-        Permissao.nivel_acesso == NivelAcesso.EDITAR.value,
-        Permissao.deleted_at.is_(None)
-    ).first()
-    
-    return permissao is not None
-
-
 @router.get("", response_model=List[CampoDinamicoResponse])
-def listar_campos(
+async def listar_campos(
     item_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Lista os campos de um item.
     """
-    campos = db.query(CampoDinamico).filter(
+    if not await AclService.pode_ver(db, item_id, current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para ver este item"
+        )
+    
+    campos = (await db.scalars(select(CampoDinamico).where(
         CampoDinamico.item_id == item_id,
         CampoDinamico.deleted_at.is_(None)
-    ).order_by(CampoDinamico.ordem).all()
+    ).order_by(CampoDinamico.ordem))).all()
     
     # Descriptografa valores sensíveis
-    for campo in campos:
-        if campo.is_sensitive and campo.value:
-            campo.value = CryptoService.decrypt(campo.value)
+    await CryptoService.decrypt_campos_async(campos)
     
     return campos
 
 
 @router.post("", response_model=CampoDinamicoResponse, status_code=status.HTTP_201_CREATED)
-def criar_campo(
+async def criar_campo(
     item_id: str,
     campo: CampoDinamicoCreate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Adiciona um novo campo a um item.
     """
-    if not check_edit_access(db, item_id, current_user.id):
+    if not await AclService.pode_editar(db, item_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Sem permissão para editar este item"
@@ -96,8 +80,10 @@ def criar_campo(
     )
     
     db.add(db_campo)
-    db.commit()
-    db.refresh(db_campo)
+    await SyncService.tocar_itens(db, [item_id])
+    await db.run_sync(SearchService.indexar_itens, [item_id])
+    await db.commit()
+    await CachePaginas.invalidar_itens(db, [item_id])
     
     # Descriptografa para retorno
     if db_campo.is_sensitive and db_campo.value:
@@ -107,27 +93,27 @@ def criar_campo(
 
 
 @router.put("/{campo_id}", response_model=CampoDinamicoResponse)
-def atualizar_campo(
+async def atualizar_campo(
     item_id: str,
     campo_id: str,
     dados: CampoDinamicoUpdate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualiza um campo de um item.
     """
-    if not check_edit_access(db, item_id, current_user.id):
+    if not await AclService.pode_editar(db, item_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Sem permissão para editar este item"
         )
     
-    campo = db.query(CampoDinamico).filter(
+    campo = await db.scalar(select(CampoDinamico).where(
         CampoDinamico.id == campo_id,
         CampoDinamico.item_id == item_id,
         CampoDinamico.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not campo:
         raise HTTPException(
@@ -148,8 +134,10 @@ def atualizar_campo(
             value = value.value
         setattr(campo, field, value)
     
-    db.commit()
-    db.refresh(campo)
+    await SyncService.tocar_itens(db, [item_id])
+    await db.run_sync(SearchService.indexar_itens, [item_id])
+    await db.commit()
+    await CachePaginas.invalidar_itens(db, [item_id])
     
     # Descriptografa para retorno
     if campo.is_sensitive and campo.value:
@@ -159,26 +147,26 @@ def atualizar_campo(
 
 
 @router.delete("/{campo_id}", status_code=status.HTTP_204_NO_CONTENT)
-def excluir_campo(
+async def excluir_campo(
     item_id: str,
     campo_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Exclui um campo de um item (soft delete).
     """
-    if not check_edit_access(db, item_id, current_user.id):
+    if not await AclService.pode_editar(db, item_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Sem permissão para editar este item"
         )
     
-    campo = db.query(CampoDinamico).filter(
+    campo = await db.scalar(select(CampoDinamico).where(
         CampoDinamico.id == campo_id,
         CampoDinamico.item_id == item_id,
         CampoDinamico.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not campo:
         raise HTTPException(
@@ -187,4 +175,7 @@ def excluir_campo(
         )
     
     campo.soft_delete()
-    db.commit()
+    await SyncService.tocar_itens(db, [item_id])
+    await db.run_sync(SearchService.indexar_itens, [item_id])
+    await db.commit()
+    await CachePaginas.invalidar_itens(db, [item_id])
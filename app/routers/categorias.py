@@ -2,40 +2,60 @@
 Router de Categorias - CRUD
 """
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.categoria import Categoria
 from app.models.usuario import Usuario
 from app.schemas.categoria import CategoriaCreate, CategoriaUpdate, CategoriaResponse
 from app.services.auth import get_current_active_user
+from app.services.cache_categorias import CacheCategorias
+from app.services.replicas import get_db_leitura
+from app.services.versao import VersaoCofre, gerar_etag, nao_modificado
 
 router = APIRouter(prefix="/api/categorias", tags=["Categorias"])
 
 
 @router.get("", response_model=List[CategoriaResponse])
-def listar_categorias(
+async def listar_categorias(
+    request: Request,
+    response: Response,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_leitura)
 ):
     """
     Lista todas as categorias disponíveis.
+    Com If-None-Match igual ao ETag atual, responde 304.
+    Com o cache ligado, a lista (e o ETag) vem da memória, sem consultar o banco.
     """
+    if CacheCategorias.ativo():
+        corpo, versao = await CacheCategorias.obter(db, current_user.id)
+        resposta_304 = nao_modificado(request, response, gerar_etag(versao))
+        if resposta_304:
+            return resposta_304
+        return Response(content=corpo, media_type="application/json", headers=dict(response.headers))
+    
+    etag = gerar_etag(await VersaoCofre.categorias(db, current_user.id))
+    resposta_304 = nao_modificado(request, response, etag)
+    if resposta_304:
+        return resposta_304
+    
     # Filtra categorias globais (usuario_id=None) ou do usuário atual
-    categorias = db.query(Categoria).filter(
+    categorias = (await db.scalars(select(Categoria).where(
         Categoria.deleted_at.is_(None),
         (Categoria.usuario_id == None) | (Categoria.usuario_id == current_user.id)
-    ).order_by(Categoria.nome).all()
+    ).order_by(Categoria.nome))).all()
     
     return categorias
 
 
 @router.post("", response_model=CategoriaResponse, status_code=status.HTTP_201_CREATED)
-def criar_categoria(
+async def criar_categoria(
     categoria: CategoriaCreate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cria uma nova categoria.
@@ -45,11 +65,11 @@ def criar_categoria(
     # ou podemos bloquear se já existe qualquer um com esse nome visível.
     # Vamos bloquear apenas se já existe UMA DO PRÓPRIO USUÁRIO com esse nome.
     
-    existing = db.query(Categoria).filter(
+    existing = await db.scalar(select(Categoria).where(
         Categoria.nome == categoria.nome,
         Categoria.usuario_id == current_user.id,
         Categoria.deleted_at.is_(None)
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -62,25 +82,25 @@ def criar_categoria(
     data["usuario_id"] = current_user.id
     db_categoria = Categoria(**data)
     db.add(db_categoria)
-    db.commit()
-    db.refresh(db_categoria)
+    await db.commit()
+    CacheCategorias.invalidar(current_user.id)
     
     return db_categoria
 
 
 @router.get("/{categoria_id}", response_model=CategoriaResponse)
-def obter_categoria(
+async def obter_categoria(
     categoria_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtém uma categoria específica.
     """
-    categoria = db.query(Categoria).filter(
+    categoria = await db.scalar(select(Categoria).where(
         Categoria.id == categoria_id,
         Categoria.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not categoria:
         raise HTTPException(
@@ -92,19 +112,19 @@ def obter_categoria(
 
 
 @router.put("/{categoria_id}", response_model=CategoriaResponse)
-def atualizar_categoria(
+async def atualizar_categoria(
     categoria_id: str,
     dados: CategoriaUpdate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualiza uma categoria.
     """
-    categoria = db.query(Categoria).filter(
+    categoria = await db.scalar(select(Categoria).where(
         Categoria.id == categoria_id,
         Categoria.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not categoria:
         raise HTTPException(
@@ -128,12 +148,12 @@ def atualizar_categoria(
 
     # Verifica se novo nome já existe para este usuário
     if dados.nome and dados.nome != categoria.nome:
-        existing = db.query(Categoria).filter(
+        existing = await db.scalar(select(Categoria).where(
             Categoria.nome == dados.nome,
             Categoria.usuario_id == current_user.id,
             Categoria.deleted_at.is_(None),
             Categoria.id != categoria_id
-        ).first()
+        ))
         
         if existing:
             raise HTTPException(
@@ -145,25 +165,25 @@ def atualizar_categoria(
     for field, value in dados.model_dump(exclude_unset=True).items():
         setattr(categoria, field, value)
     
-    db.commit()
-    db.refresh(categoria)
+    await db.commit()
+    CacheCategorias.invalidar(current_user.id)
     
     return categoria
 
 
 @router.delete("/{categoria_id}", status_code=status.HTTP_204_NO_CONTENT)
-def excluir_categoria(
+async def excluir_categoria(
     categoria_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Exclui uma categoria (soft delete).
     """
-    categoria = db.query(Categoria).filter(
+    categoria = await db.scalar(select(Categoria).where(
         Categoria.id == categoria_id,
         Categoria.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not categoria:
         raise HTTPException(
@@ -189,4 +209,5 @@ def excluir_categoria(
     # Por enquanto, mantemos lógica simples. Soft delete.
     
     categoria.soft_delete()
-    db.commit()
+    await db.commit()
+    CacheCategorias.invalidar(current_user.id)
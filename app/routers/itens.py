@@ -1,288 +1,711 @@
 """
 Router de Itens do Cofre - CRUD Principal
 """
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
+from app.config import get_settings
 from app.database import get_db
 from app.models.usuario import Usuario
 from app.models.item_cofre import ItemCofre
 from app.models.campo_dinamico import CampoDinamico
+from app.models.categoria import Categoria
+from app.models.base import generate_uuid
 from app.models.permissao import Permissao, NivelAcesso
 from app.schemas.item_cofre import (
     ItemCofreCreate, 
+    ItemCofreBulkCreate,
     ItemCofreUpdate, 
     ItemCofreResponse,
-    ItemCofreCompleto
+    ItemCofreCompleto,
+    VersaoCofreResponse,
+    SincronizacaoResponse
 )
-from app.schemas.campo_dinamico import CampoDinamicoCreate
+from app.schemas.campo_dinamico import (
+    CampoDinamicoCreate,
+    CampoDinamicoItemUpdate,
+    CampoDinamicoResponse
+)
+from app.schemas.categoria import CategoriaResponse
+from app.services.acl import NIVEL_DONO, AclService
 from app.services.auth import get_current_active_user
+from app.services.replicas import cliente_gravou, get_db_leitura
+from app.services.cache_paginas import CachePaginas
 from app.services.crypto import CryptoService
+from app.services.exportacao import ExportService
+from app.services.search import SearchService
+from app.services.serializacao import Serializador
+from app.services.sync import SyncService
+from app.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.services.versao import VersaoCofre, gerar_etag, nao_modificado
 
+settings = get_settings()
 router = APIRouter(prefix="/api/itens", tags=["Itens do Cofre"])
 
 
-def check_item_access(
-    db: Session, 
+def opcoes_carregamento(detalhe: bool = False) -> list:
+    """
+    Opções de eager loading para consultas de itens.
+    Nas listagens os campos vêm por selectinload (uma consulta extra por página,
+    sem repetir as colunas do item em cada campo); no detalhe de um item, por JOIN.
+    """
+    if detalhe or settings.ITENS_CAMPOS_LOADING == "joined":
+        campos = joinedload(ItemCofre.campos)
+    else:
+        campos = selectinload(ItemCofre.campos)
+    
+    return [campos, joinedload(ItemCofre.categoria), joinedload(ItemCofre.usuario)]
+
+
+async def check_item_access(
+    db: AsyncSession, 
     item_id: str, 
     user_id: str, 
     require_edit: bool = False
 ) -> Optional[ItemCofre]:
     """
-    Verifica se o usuário tem acesso ao item.
+    Verifica se o usuário tem acesso ao item (pelo mapa de acesso em memória).
     Retorna o item se tiver acesso, None caso contrário.
     """
-    # Primeiro, verifica se é o dono
-    item = db.query(ItemCofre).filter(
-        ItemCofre.id == item_id,
-        ItemCofre.user_id == user_id,
-        ItemCofre.deleted_at.is_(None)
-    ).first()
-    
-    if item:
-        return item
+    if require_edit:
+        permitido = await AclService.pode_editar(db, item_id, user_id)
+    else:
+        permitido = await AclService.pode_ver(db, item_id, user_id)
     
-    # Se não é dono, verifica permissões
-    item = db.query(ItemCofre).filter(
-        ItemCofre.id == item_id,
-        ItemCofre.deleted_at.is_(None)
-    ).first()
+    if not permitido:
+        return None
     
-    if not item:
+    item = await db.get(ItemCofre, item_id)
+    if not item or item.deleted_at is not None:
         return None
     
-    # Verifica permissão
-    permissao = db.query(Permissao).filter(
-        Permissao.item_id == item_id,
+    return item
+
+
+def consulta_itens_acessiveis(user_id: str):
+    """
+    Consulta dos itens próprios e compartilhados com o usuário.
+    O nível de acesso da permissão (se houver) vem como segunda coluna.
+    """
+    # Os dois lados do OR são atendidos por índice (dono e id do item)
+    compartilhados = select(Permissao.item_id).where(
         Permissao.shared_with_user_id == user_id,
         Permissao.deleted_at.is_(None)
-    ).first()
+    )
     
-    if not permissao:
-        return None
+    return select(ItemCofre, Permissao.nivel_acesso).outerjoin(
+        Permissao,
+        and_(
+            Permissao.item_id == ItemCofre.id,
+            Permissao.shared_with_user_id == user_id,
+            Permissao.deleted_at.is_(None)
+        )
+    ).options(
+        *opcoes_carregamento()
+    ).where(
+        or_(ItemCofre.user_id == user_id, ItemCofre.id.in_(compartilhados)),
+        ItemCofre.deleted_at.is_(None)
+    )
+
+
+async def carregar_item(db: AsyncSession, item_id: str) -> ItemCofre:
+    """
+    Recarrega um item recém-gravado com os relacionamentos da resposta.
+    Sobrescreve o que já estiver na sessão (campos removidos ou adicionados).
+    """
+    return await db.scalar(
+        select(ItemCofre)
+        .options(*opcoes_carregamento(detalhe=True))
+        .where(ItemCofre.id == item_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def aplicar_campos(
+    db: AsyncSession,
+    item_id: str,
+    campos: List[CampoDinamicoItemUpdate]
+) -> bool:
+    """
+    Substitui os campos do item pela lista enviada, alterando só o que mudou.
+    Cada campo enviado é associado a um existente pelo id ou, sem id, pelo label;
+    os existentes que sobrarem são removidos. Só valores novos ou alterados são
+    criptografados. Uma instrução em lote por tipo (UPDATE, INSERT, DELETE).
+    Retorna se algum campo foi gravado.
+    """
+    existentes = (await db.execute(
+        select(
+            CampoDinamico.id,
+            CampoDinamico.label,
+            CampoDinamico.value,
+            CampoDinamico.field_type,
+            CampoDinamico.is_sensitive,
+            CampoDinamico.ordem
+        ).where(
+            CampoDinamico.item_id == item_id,
+            CampoDinamico.deleted_at.is_(None)
+        ).order_by(CampoDinamico.ordem, CampoDinamico.created_at)
+    )).all()
+    por_id = {campo.id: campo for campo in existentes}
+    
+    # Associa os enviados aos existentes: primeiro os com id, depois pelo label
+    pares = [None] * len(campos)
+    livres = dict(por_id)
+    for i, campo in enumerate(campos):
+        if campo.id is None:
+            continue
+        if campo.id not in livres:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campo não encontrado neste item: {campo.id}"
+            )
+        pares[i] = livres.pop(campo.id)
+    for i, campo in enumerate(campos):
+        if campo.id is None:
+            pares[i] = next((e for e in livres.values() if e.label == campo.label), None)
+            if pares[i] is not None:
+                del livres[pares[i].id]
+    
+    # Valor atual dos sensíveis associados, para comparar com o enviado
+    sensiveis = [e for e in pares if e is not None and e.is_sensitive and e.value]
+    atuais = dict(zip(
+        (e.id for e in sensiveis),
+        await CryptoService.decrypt_many_async([e.value for e in sensiveis])
+    ))
+    
+    agora = datetime.utcnow()
+    novos, alterados, cifrar = [], [], []
+    for campo, existente in zip(campos, pares):
+        linha = {
+            "label": campo.label,
+            "value": campo.value,
+            "field_type": campo.field_type.value,
+            "is_sensitive": campo.is_sensitive,
+            "ordem": campo.ordem,
+        }
+        if existente is None:
+            linha["item_id"] = item_id
+            novos.append(linha)
+        else:
+            valor_atual = atuais.get(existente.id, existente.value)
+            mesmo_valor = (
+                valor_atual == campo.value
+                and bool(existente.is_sensitive) == campo.is_sensitive
+            )
+            if mesmo_valor:
+                linha["value"] = existente.value
+            if all(linha[chave] == existente._mapping[chave] for chave in linha):
+                continue
+            linha.update(id=existente.id, updated_at=agora)
+            alterados.append(linha)
+            if mesmo_valor:
+                continue
+        if linha["is_sensitive"] and linha["value"]:
+            cifrar.append(linha)
+    
+    if cifrar:
+        valores = await CryptoService.encrypt_many_async([l["value"] for l in cifrar])
+        for linha, valor in zip(cifrar, valores):
+            linha["value"] = valor
+    
+    if alterados:
+        await db.execute(update(CampoDinamico), alterados)
+    if novos:
+        await db.execute(insert(CampoDinamico), novos)
+    if livres:
+        await db.execute(delete(CampoDinamico).where(CampoDinamico.id.in_(list(livres))))
+    
+    return bool(alterados or novos or livres)
+
+
+async def inserir_itens(
+    db: AsyncSession,
+    user_id: str,
+    itens: List[ItemCofreCreate]
+) -> List[ItemCofreCompleto]:
+    """
+    Cria os itens e seus campos com um INSERT em lote por tabela (executemany),
+    criptografando todos os valores sensíveis de uma vez.
+    A resposta é montada a partir do que foi enviado, sem reler nem descriptografar.
+    """
+    agora = datetime.utcnow()
+    linhas_itens, linhas_campos = [], []
     
-    if require_edit and permissao.nivel_acesso != NivelAcesso.EDITAR.value:
-        return None
+    for item in itens:
+        item_id = generate_uuid()
+        linhas_itens.append({
+            "id": item_id,
+            "user_id": user_id,
+            "titulo": item.titulo,
+            "category_id": item.category_id,
+            "nota_adicional": item.nota_adicional,
+            "favorito": item.favorito,
+            "created_at": agora,
+            "updated_at": agora,
+        })
+        for campo in item.campos or []:
+            linhas_campos.append({
+                "id": generate_uuid(),
+                "item_id": item_id,
+                "label": campo.label,
+                "value": campo.value,
+                "field_type": campo.field_type.value,
+                "is_sensitive": campo.is_sensitive,
+                "ordem": campo.ordem,
+                "created_at": agora,
+                "updated_at": agora,
+            })
+    
+    # Resposta com os valores em claro, antes da criptografia
+    campos_por_item = {}
+    for linha in linhas_campos:
+        campos_por_item.setdefault(linha["item_id"], []).append(CampoDinamicoResponse(**linha))
+    
+    # Criptografa os valores sensíveis de todos os itens em um único lote
+    cifrar = [linha for linha in linhas_campos if linha["is_sensitive"] and linha["value"]]
+    if cifrar:
+        valores = await CryptoService.encrypt_many_async([l["value"] for l in cifrar])
+        for linha, valor in zip(cifrar, valores):
+            linha["value"] = valor
+    
+    await db.execute(insert(ItemCofre), linhas_itens)
+    if linhas_campos:
+        await db.execute(insert(CampoDinamico), linhas_campos)
+    
+    # Categorias dos itens, em uma consulta
+    category_ids = {linha["category_id"] for linha in linhas_itens if linha["category_id"]}
+    categorias = {}
+    if category_ids:
+        categorias = {
+            categoria.id: CategoriaResponse.model_validate(categoria)
+            for categoria in (await db.scalars(
+                select(Categoria).where(Categoria.id.in_(category_ids))
+            )).all()
+        }
+    
+    return [
+        ItemCofreCompleto(
+            **linha,
+            campos=campos_por_item.get(linha["id"], []),
+            categoria=categorias.get(linha["category_id"])
+        )
+        for linha in linhas_itens
+    ]
+
+
+async def preparar_itens(rows, user_id: str) -> List[ItemCofre]:
+    """
+    Preenche os campos de exibição (dono, edição) de cada item
+    e descriptografa os campos sensíveis da página em um único lote, fora do event loop.
+    """
+    itens = []
+    for item, nivel in rows:
+        item.dono_nome = item.usuario.nome if item.user_id != user_id else "Você"
+        
+        # Define se pode editar
+        if item.user_id == user_id:
+            item.pode_editar = True
+        else:
+            item.pode_editar = (nivel == NivelAcesso.EDITAR.value)
+        itens.append(item)
     
-    return item
+    await CryptoService.decrypt_campos_async(campo for item in itens for campo in item.campos)
+    return itens
 
 
 @router.get("", response_model=List[ItemCofreCompleto])
-def listar_itens(
+async def listar_itens(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: str = Query(None, description="Cursor da próxima página (substitui skip)"),
     categoria_id: str = Query(None, description="Filtrar por categoria"),
     favoritos: bool = Query(None, description="Apenas favoritos"),
-    busca: str = Query(None, description="Buscar por título"),
+    busca: str = Query(None, description="Buscar por título, notas e campos"),
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_leitura)
 ):
     """
     Lista os itens do cofre do usuário logado.
     Inclui itens próprios e compartilhados.
+    Quando houver mais itens, o cursor da próxima página vem no header X-Next-Cursor.
+    Com If-None-Match igual ao ETag atual, responde 304 sem carregar os itens.
+    Com o cache de páginas ligado, a mesma página na mesma versão vem da memória.
     """
-    # IDs de itens compartilhados com o usuário
-    shared_item_ids = db.query(Permissao.item_id).filter(
-        Permissao.shared_with_user_id == current_user.id,
-        Permissao.deleted_at.is_(None)
-    ).all()
-    shared_item_ids = [r[0] for r in shared_item_ids]
-
-    # Itens próprios e compartilhados
-    query = db.query(ItemCofre).options(
-        joinedload(ItemCofre.campos),
-        joinedload(ItemCofre.categoria),
-        joinedload(ItemCofre.usuario)
-    ).filter(
-        (ItemCofre.user_id == current_user.id) | (ItemCofre.id.in_(shared_item_ids)),
-        ItemCofre.deleted_at.is_(None)
-    )
+    # Cliente já tem esta versão: nada é carregado nem descriptografado
+    etag = gerar_etag(await VersaoCofre.itens(db, current_user.id), request.url.query)
+    resposta_304 = nao_modificado(request, response, etag)
+    if resposta_304:
+        return resposta_304
+    
+    if CachePaginas.ativo():
+        pagina = CachePaginas.obter(current_user.id, etag, dict(response.headers))
+        if pagina:
+            return pagina
+    
+    # Itens próprios e compartilhados em uma única consulta
+    query = consulta_itens_acessiveis(current_user.id)
     
     # Filtros
     if categoria_id:
-        query = query.filter(ItemCofre.category_id == categoria_id)
+        query = query.where(ItemCofre.category_id == categoria_id)
     
     if favoritos is not None:
-        query = query.filter(ItemCofre.favorito == favoritos)
+        query = query.where(ItemCofre.favorito == favoritos)
     
     if busca:
-        query = query.filter(ItemCofre.titulo.ilike(f"%{busca}%"))
+        query = SearchService.filtrar(query, busca)
+    
+    # Paginação por chave: continua após (favorito, titulo, id) do último item
+    favorito_ordem = func.coalesce(ItemCofre.favorito, False)
+    if cursor:
+        favorito_c, titulo_c, id_c = decode_cursor(cursor, bool, str, str)
+        depois = or_(
+            ItemCofre.titulo > titulo_c,
+            and_(ItemCofre.titulo == titulo_c, ItemCofre.id > id_c)
+        )
+        if favorito_c:
+            # Depois do último favorito vêm todos os não favoritos
+            query = query.where(or_(
+                and_(favorito_ordem.is_(True), depois),
+                favorito_ordem.is_(False)
+            ))
+        else:
+            query = query.where(favorito_ordem.is_(False), depois)
     
-    itens = query.order_by(ItemCofre.favorito.desc(), ItemCofre.titulo).offset(skip).limit(limit).all()
+    query = query.order_by(favorito_ordem.desc(), ItemCofre.titulo, ItemCofre.id)
+    if not cursor:
+        query = query.offset(skip)
     
-    # Prepara permissões para consulta rápida
-    permissoes_map = {p.item_id: p.nivel_acesso for p in db.query(Permissao).filter(
-        Permissao.shared_with_user_id == current_user.id,
-        Permissao.deleted_at.is_(None)
-    ).all()}
+    rows = (await db.execute(query.limit(limit))).unique().all()
+    
+    if len(rows) == limit:
+        ultimo = rows[-1][0]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            [bool(ultimo.favorito), ultimo.titulo, ultimo.id]
+        )
+    
+    itens = await preparar_itens(rows, current_user.id)
+    if CachePaginas.ativo():
+        return await CachePaginas.guardar(current_user.id, etag, itens, dict(response.headers))
+    
+    return await Serializador.responder_itens(itens, response)
+
+
+@router.get("/versao", response_model=VersaoCofreResponse)
+async def obter_versao(
+    request: Request,
+    response: Response,
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db_leitura)
+):
+    """
+    Versão atual do cofre do usuário (uma consulta, sem carregar itens).
+    Muda a cada inclusão, alteração ou exclusão de itens, campos,
+    compartilhamentos e categorias visíveis ao usuário.
+    """
+    versao = await VersaoCofre.itens(db, current_user.id)
+    resposta_304 = nao_modificado(request, response, gerar_etag(versao))
+    if resposta_304:
+        return resposta_304
+    
+    return VersaoCofreResponse(versao=versao)
+
 
-    # Configura campos adicionais e descriptografa
+def respostas_sync(itens: List[ItemCofre]) -> List[ItemCofreCompleto]:
+    """Itens da sincronização, com a lista atual de campos (os excluídos ficam de fora)"""
+    respostas = []
     for item in itens:
-        item.dono_nome = item.usuario.nome if item.user_id != current_user.id else "Você"
-        
-        # Define se pode editar
-        if item.user_id == current_user.id:
-            item.pode_editar = True
-        else:
-            nivel = permissoes_map.get(item.id)
-            item.pode_editar = (nivel == NivelAcesso.EDITAR.value)
+        resposta = ItemCofreCompleto.model_validate(item)
+        resposta.campos = [
+            campo for campo, original in zip(resposta.campos, item.campos)
+            if original.deleted_at is None
+        ]
+        respostas.append(resposta)
+    return respostas
 
-        for campo in item.campos:
-            if campo.is_sensitive and campo.value:
-                campo.value = CryptoService.decrypt(campo.value)
+
+@router.get("/sync", response_model=SincronizacaoResponse)
+async def sincronizar_itens(
+    response: Response,
+    since: str = Query(None, description="sync_token da última sincronização (vazio: tudo)"),
+    cursor: str = Query(None, description="Cursor da próxima página da sincronização completa"),
+    limit: int = Query(500, ge=1, le=1000, description="Itens por página da sincronização completa"),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Alterações do cofre desde o token: itens criados ou alterados (com seus campos),
+    itens excluídos ou que deixaram de ser compartilhados, e compartilhamentos dos
+    itens do usuário. O sync_token da resposta é o since da próxima chamada.
+    Sem since, é a sincronização completa, em páginas de até limit itens: enquanto
+    houver mais, o cursor da próxima página vem no header X-Next-Cursor e o sync_token
+    vem vazio; os compartilhamentos e o token vêm na última página.
+    Para um backup do cofre inteiro, use /api/itens/export.
+    Lida sempre do primário: o token não pode ficar à frente de uma réplica atrasada.
+    """
+    if not since:
+        return await sincronizacao_completa(response, cursor, limit, current_user.id, db)
+    
+    desde = SyncService.ler_token(since)
+    alteracoes = await SyncService.alteracoes(db, current_user.id, desde)
+    
+    itens = []
+    if alteracoes.itens:
+        query = consulta_itens_acessiveis(current_user.id).where(
+            ItemCofre.id.in_(alteracoes.itens)
+        ).order_by(ItemCofre.id)
+        itens = await preparar_itens((await db.execute(query)).unique().all(), current_user.id)
+    
+    # Alterados que não estão mais acessíveis também saem do cliente
+    carregados = {item.id for item in itens}
+    removidos = (alteracoes.itens_removidos | alteracoes.itens) - carregados
+    
+    return SincronizacaoResponse(
+        itens=await run_in_threadpool(respostas_sync, itens),
+        itens_removidos=sorted(removidos),
+        permissoes=alteracoes.permissoes,
+        permissoes_removidas=alteracoes.permissoes_removidas,
+        sync_token=alteracoes.sync_token
+    )
+
+
+async def sincronizacao_completa(
+    response: Response,
+    cursor: Optional[str],
+    limit: int,
+    user_id: str,
+    db: AsyncSession
+) -> SincronizacaoResponse:
+    """
+    Uma página da sincronização completa: itens acessíveis em ordem de id.
+    A marca do token é fixada na primeira página e segue no cursor.
+    """
+    if cursor:
+        marca_c, ultimo_id = decode_cursor(cursor, str, str)
+        try:
+            marca = datetime.fromisoformat(marca_c)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+    else:
+        marca, ultimo_id = SyncService.marca_atual(), ""
+    
+    query = consulta_itens_acessiveis(user_id).where(
+        ItemCofre.id > ultimo_id
+    ).order_by(ItemCofre.id).limit(limit)
+    itens = await preparar_itens((await db.execute(query)).unique().all(), user_id)
+    respostas = await run_in_threadpool(respostas_sync, itens)
+    
+    if len(itens) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([marca.isoformat(), itens[-1].id])
+        return SincronizacaoResponse(itens=respostas, sync_token=None)
+    
+    permissoes, _ = await SyncService.permissoes(db, user_id)
+    return SincronizacaoResponse(
+        itens=respostas,
+        permissoes=permissoes,
+        sync_token=SyncService.gerar_token(marca)
+    )
+
+
+@router.get("/busca", response_model=List[ItemCofreCompleto])
+async def buscar_itens(
+    q: str = Query(..., min_length=1, description="Termos da busca"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db_leitura)
+):
+    """
+    Busca nos itens acessíveis ao usuário, ordenando por relevância.
+    Considera título, notas, rótulos dos campos e valores não sensíveis.
+    """
+    query, relevancia = SearchService.ranking(consulta_itens_acessiveis(current_user.id), q)
+    rows = (await db.execute(query.order_by(relevancia, ItemCofre.id).limit(limit))).unique().all()
     
-    return itens
+    return await Serializador.responder_itens(await preparar_itens(rows, current_user.id))
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "application/gzip": {}}}}
+)
+async def exportar_itens(
+    request: Request,
+    gzip: bool = Query(False, description="Compactar a exportação em gzip"),
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Exporta o cofre do usuário (itens próprios, com os campos descriptografados)
+    em NDJSON: uma linha JSON por item, no formato da listagem.
+    Os itens são lidos e enviados em blocos (EXPORT_CHUNK_SIZE), sem carregar
+    o cofre inteiro na memória.
+    """
+    nome = f"cofre-{datetime.utcnow():%Y%m%d}.ndjson"
+    if gzip:
+        nome += ".gz"
+    
+    # O fluxo lê em uma sessão própria: a da requisição (get_current_user)
+    # devolve a conexão antes, para não segurar duas durante a exportação
+    await db.close()
+    
+    return StreamingResponse(
+        ExportService.ndjson(current_user.id, compactar=gzip, gravou=cliente_gravou(request)),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{nome}"',
+            "Cache-Control": "no-store"
+        }
+    )
 
 
 @router.get("/compartilhados", response_model=List[ItemCofreCompleto])
-def listar_itens_compartilhados(
+async def listar_itens_compartilhados(
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_leitura)
 ):
     """
     Lista os itens compartilhados com o usuário logado.
     """
-    # Busca permissões do usuário
-    permissoes = db.query(Permissao).filter(
-        Permissao.shared_with_user_id == current_user.id,
-        Permissao.deleted_at.is_(None)
-    ).all()
-    
-    item_ids = [p.item_id for p in permissoes]
-    
-    if not item_ids:
-        return []
-    
-    itens = db.query(ItemCofre).options(
-        joinedload(ItemCofre.campos),
-        joinedload(ItemCofre.categoria)
-    ).filter(
-        ItemCofre.id.in_(item_ids),
+    # Itens com permissão ativa para o usuário, em uma única consulta
+    itens = (await db.scalars(select(ItemCofre).join(
+        Permissao,
+        and_(
+            Permissao.item_id == ItemCofre.id,
+            Permissao.shared_with_user_id == current_user.id,
+            Permissao.deleted_at.is_(None)
+        )
+    ).options(
+        *opcoes_carregamento()
+    ).where(
         ItemCofre.deleted_at.is_(None)
-    ).all()
+    ))).unique().all()
     
     # Descriptografa valores sensíveis
-    for item in itens:
-        for campo in item.campos:
-            if campo.is_sensitive and campo.value:
-                campo.value = CryptoService.decrypt(campo.value)
+    await CryptoService.decrypt_campos_async(campo for item in itens for campo in item.campos)
     
-    return itens
+    return await Serializador.responder_itens(itens)
 
 
 @router.post("", response_model=ItemCofreCompleto, status_code=status.HTTP_201_CREATED)
-def criar_item(
+async def criar_item(
     item: ItemCofreCreate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Cria um novo item no cofre.
     """
-    # Cria o item
-    db_item = ItemCofre(
-        user_id=current_user.id,
-        titulo=item.titulo,
-        category_id=item.category_id,
-        nota_adicional=item.nota_adicional,
-        favorito=item.favorito
-    )
+    (criado,) = await inserir_itens(db, current_user.id, [item])
     
-    db.add(db_item)
-    db.flush()  # Para obter o ID
-    
-    # Adiciona campos dinâmicos
-    for campo in item.campos:
-        value = campo.value
-        # Criptografa se for sensível
-        if campo.is_sensitive and value:
-            value = CryptoService.encrypt(value)
-        
-        db_campo = CampoDinamico(
-            item_id=db_item.id,
-            label=campo.label,
-            value=value,
-            field_type=campo.field_type.value,
-            is_sensitive=campo.is_sensitive,
-            ordem=campo.ordem
-        )
-        db.add(db_campo)
+    await db.run_sync(SearchService.indexar_itens, [criado.id])
+    await db.commit()
+    AclService.registrar_itens(current_user.id, [criado.id])
+    CachePaginas.invalidar_usuarios([current_user.id])
     
-    db.commit()
-    db.refresh(db_item)
+    return criado
+
+
+@router.post("/bulk", response_model=List[ItemCofreCompleto], status_code=status.HTTP_201_CREATED)
+async def criar_itens_em_lote(
+    dados: ItemCofreBulkCreate,
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Cria vários itens de uma vez, em uma única transação (ex.: importação de
+    outro gerenciador de senhas). Se algum item falhar, nenhum é criado.
+    """
+    criados = await inserir_itens(db, current_user.id, dados.itens)
     
-    # Descriptografa para retorno
-    for campo in db_item.campos:
-        if campo.is_sensitive and campo.value:
-            campo.value = CryptoService.decrypt(campo.value)
+    await db.run_sync(SearchService.indexar_itens, [item.id for item in criados])
+    await db.commit()
+    AclService.registrar_itens(current_user.id, [item.id for item in criados])
+    CachePaginas.invalidar_usuarios([current_user.id])
     
-    return db_item
+    return criados
 
 
 @router.get("/{item_id}", response_model=ItemCofreCompleto)
-def obter_item(
+async def obter_item(
     item_id: str,
+    request: Request,
+    response: Response,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_leitura),
+    primario: AsyncSession = Depends(get_db)
 ):
     """
     Obtém um item específico do cofre.
+    Com If-None-Match igual ao ETag atual, responde 304 sem carregar o item.
+    Existência e acesso são conferidos antes do 304 (também com If-None-Match: *).
     """
-    item = db.query(ItemCofre).options(
-        joinedload(ItemCofre.campos),
-        joinedload(ItemCofre.categoria),
-        joinedload(ItemCofre.usuario)
-    ).filter(
-        ItemCofre.id == item_id,
-        ItemCofre.deleted_at.is_(None)
-    ).first()
-    
-    if not item:
+    # A versão inclui o acesso do usuário: revogado o compartilhamento, não há 304
+    versao = await VersaoCofre.item(db, item_id, current_user.id)
+    if versao is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Item não encontrado"
         )
     
-    # Verifica acesso
-    permissao = db.query(Permissao).filter(
-        Permissao.item_id == item_id,
-        Permissao.shared_with_user_id == current_user.id,
-        Permissao.deleted_at.is_(None)
-    ).first()
-
-    if item.user_id != current_user.id and not permissao:
+    # Verifica acesso (no primário: a mesma sessão de get_current_user)
+    nivel = await AclService.nivel(primario, item_id, current_user.id)
+    
+    if nivel is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Acesso negado"
         )
     
+    resposta_304 = nao_modificado(request, response, gerar_etag(versao))
+    if resposta_304:
+        return resposta_304
+    
+    item = await db.scalar(select(ItemCofre).options(
+        *opcoes_carregamento(detalhe=True)
+    ).where(
+        ItemCofre.id == item_id,
+        ItemCofre.deleted_at.is_(None)
+    ))
+    
+    if not item:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Item não encontrado"
+        )
+    
     # Preenche campos de display
     item.dono_nome = item.usuario.nome if item.user_id != current_user.id else "Você"
-    if item.user_id == current_user.id:
-        item.pode_editar = True
-    else:
-        item.pode_editar = (permissao.nivel_acesso == NivelAcesso.EDITAR.value)
+    item.pode_editar = nivel in (NIVEL_DONO, NivelAcesso.EDITAR.value)
 
     # Descriptografa valores sensíveis
-    for campo in item.campos:
-        if campo.is_sensitive and campo.value:
-            campo.value = CryptoService.decrypt(campo.value)
+    await CryptoService.decrypt_campos_async(item.campos)
     
     return item
 
 
 @router.put("/{item_id}", response_model=ItemCofreCompleto)
-def atualizar_item(
+async def atualizar_item(
     item_id: str,
     dados: ItemCofreUpdate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualiza um item do cofre.
     """
-    item = check_item_access(db, item_id, current_user.id, require_edit=True)
+    item = await check_item_access(db, item_id, current_user.id, require_edit=True)
     
     if not item:
         raise HTTPException(
@@ -301,63 +724,38 @@ def atualizar_item(
     for field, value in dados_dict.items():
         setattr(item, field, value)
     
-    # Se houver atualização de campos dinâmicos
-    if campos_update is not None:
-        # Remove campos existentes
-        db.query(CampoDinamico).filter(CampoDinamico.item_id == item.id).delete()
-        
-        # Adiciona novos campos
-        for campo in campos_update:
-            # Pydantic model to dict
-            campo_dict = campo if isinstance(campo, dict) else campo.model_dump()
-            
-            value = campo_dict.get("value")
-            # Criptografa se for sensível
-            if campo_dict.get("is_sensitive") and value:
-                value = CryptoService.encrypt(value)
-            
-            db_campo = CampoDinamico(
-                item_id=item.id,
-                label=campo_dict.get("label"),
-                value=value,
-                field_type=campo_dict.get("field_type"),
-                is_sensitive=campo_dict.get("is_sensitive"),
-                ordem=campo_dict.get("ordem", "0")
-            )
-            db.add(db_campo)
+    # Se houver atualização de campos dinâmicos, grava só a diferença
+    if campos_update is not None and await aplicar_campos(db, item.id, dados.campos):
+        await SyncService.tocar_itens(db, [item.id])
     
-    db.commit()
-    db.refresh(item)
+    await db.run_sync(SearchService.indexar_itens, [item.id])
+    await db.commit()
+    await CachePaginas.invalidar_itens(db, [item.id])
     
     # Carrega relacionamentos
-    item = db.query(ItemCofre).options(
-        joinedload(ItemCofre.campos),
-        joinedload(ItemCofre.categoria)
-    ).filter(ItemCofre.id == item_id).first()
+    item = await carregar_item(db, item_id)
     
     # Descriptografa valores sensíveis
-    for campo in item.campos:
-        if campo.is_sensitive and campo.value:
-            campo.value = CryptoService.decrypt(campo.value)
+    await CryptoService.decrypt_campos_async(item.campos)
     
     return item
 
 
 @router.delete("/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-def excluir_item(
+async def excluir_item(
     item_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Exclui um item do cofre (soft delete).
     Apenas o dono pode excluir.
     """
-    item = db.query(ItemCofre).filter(
+    item = await db.scalar(select(ItemCofre).where(
         ItemCofre.id == item_id,
         ItemCofre.user_id == current_user.id,
         ItemCofre.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not item:
         raise HTTPException(
@@ -366,23 +764,25 @@ def excluir_item(
         )
     
     item.soft_delete()
-    db.commit()
+    await db.run_sync(SearchService.indexar_itens, [item.id])
+    await db.commit()
+    CachePaginas.invalidar_usuarios(await AclService.invalidar_item(db, item.id))
 
 
 @router.post("/{item_id}/favorito", response_model=ItemCofreResponse)
-def toggle_favorito(
+async def toggle_favorito(
     item_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Alterna o status de favorito de um item.
     """
-    item = db.query(ItemCofre).filter(
+    item = await db.scalar(select(ItemCofre).where(
         ItemCofre.id == item_id,
         ItemCofre.user_id == current_user.id,
         ItemCofre.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not item:
         raise HTTPException(
@@ -391,7 +791,7 @@ def toggle_favorito(
         )
     
     item.favorito = not item.favorito
-    db.commit()
-    db.refresh(item)
+    await db.commit()
+    await CachePaginas.invalidar_itens(db, [item.id])
     
     return item
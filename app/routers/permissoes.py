@@ -3,7 +3,9 @@ Router de Permissões - Compartilhamento de itens
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
 from app.database import get_db
 from app.models.usuario import Usuario
@@ -15,27 +17,29 @@ from app.schemas.permissao import (
     PermissaoResponse,
     PermissaoComUsuario
 )
+from app.services.acl import AclService
 from app.services.auth import get_current_active_user
+from app.services.cache_paginas import CachePaginas
 
 router = APIRouter(prefix="/api/permissoes", tags=["Permissões"])
 
 
 @router.get("/item/{item_id}", response_model=List[PermissaoComUsuario])
-def listar_permissoes_item(
+async def listar_permissoes_item(
     item_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Lista todas as permissões de um item.
     Apenas o dono pode ver.
     """
     # Verifica se é o dono
-    item = db.query(ItemCofre).filter(
+    item = await db.scalar(select(ItemCofre).where(
         ItemCofre.id == item_id,
         ItemCofre.user_id == current_user.id,
         ItemCofre.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not item:
         raise HTTPException(
@@ -43,32 +47,32 @@ def listar_permissoes_item(
             detail="Item não encontrado"
         )
     
-    permissoes = db.query(Permissao).options(
+    permissoes = (await db.scalars(select(Permissao).options(
         joinedload(Permissao.usuario_compartilhado)
-    ).filter(
+    ).where(
         Permissao.item_id == item_id,
         Permissao.deleted_at.is_(None)
-    ).all()
+    ))).all()
     
     return permissoes
 
 
 @router.post("", response_model=PermissaoResponse, status_code=status.HTTP_201_CREATED)
-def criar_permissao(
+async def criar_permissao(
     permissao: PermissaoCreate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Compartilha um item com outro usuário.
     Apenas o dono pode compartilhar.
     """
     # Verifica se é o dono do item
-    item = db.query(ItemCofre).filter(
+    item = await db.scalar(select(ItemCofre).where(
         ItemCofre.id == permissao.item_id,
         ItemCofre.user_id == current_user.id,
         ItemCofre.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not item:
         raise HTTPException(
@@ -77,10 +81,10 @@ def criar_permissao(
         )
     
     # Verifica se o usuário de destino existe
-    usuario_destino = db.query(Usuario).filter(
+    usuario_destino = await db.scalar(select(Usuario).where(
         Usuario.id == permissao.shared_with_user_id,
         Usuario.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not usuario_destino:
         raise HTTPException(
@@ -96,11 +100,11 @@ def criar_permissao(
         )
     
     # Verifica se já existe permissão
-    existing = db.query(Permissao).filter(
+    existing = await db.scalar(select(Permissao).where(
         Permissao.item_id == permissao.item_id,
         Permissao.shared_with_user_id == permissao.shared_with_user_id,
         Permissao.deleted_at.is_(None)
-    ).first()
+    ))
     
     if existing:
         raise HTTPException(
@@ -115,27 +119,28 @@ def criar_permissao(
     )
     
     db.add(db_permissao)
-    db.commit()
-    db.refresh(db_permissao)
+    await db.commit()
+    AclService.invalidar_usuarios([db_permissao.shared_with_user_id])
+    CachePaginas.invalidar_usuarios([current_user.id, db_permissao.shared_with_user_id])
     
     return db_permissao
 
 
 @router.put("/{permissao_id}", response_model=PermissaoResponse)
-def atualizar_permissao(
+async def atualizar_permissao(
     permissao_id: str,
     dados: PermissaoUpdate,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Atualiza o nível de acesso de uma permissão.
     Apenas o dono do item pode alterar.
     """
-    permissao = db.query(Permissao).filter(
+    permissao = await db.scalar(select(Permissao).where(
         Permissao.id == permissao_id,
         Permissao.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not permissao:
         raise HTTPException(
@@ -144,10 +149,10 @@ def atualizar_permissao(
         )
     
     # Verifica se é o dono do item
-    item = db.query(ItemCofre).filter(
+    item = await db.scalar(select(ItemCofre).where(
         ItemCofre.id == permissao.item_id,
         ItemCofre.user_id == current_user.id
-    ).first()
+    ))
     
     if not item:
         raise HTTPException(
@@ -158,26 +163,27 @@ def atualizar_permissao(
     if dados.nivel_acesso:
         permissao.nivel_acesso = dados.nivel_acesso.value
     
-    db.commit()
-    db.refresh(permissao)
+    await db.commit()
+    AclService.invalidar_usuarios([permissao.shared_with_user_id])
+    CachePaginas.invalidar_usuarios([item.user_id, permissao.shared_with_user_id])
     
     return permissao
 
 
 @router.delete("/{permissao_id}", status_code=status.HTTP_204_NO_CONTENT)
-def revogar_permissao(
+async def revogar_permissao(
     permissao_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Revoga uma permissão de acesso.
     O dono do item ou o usuário que recebeu podem revogar.
     """
-    permissao = db.query(Permissao).filter(
+    permissao = await db.scalar(select(Permissao).where(
         Permissao.id == permissao_id,
         Permissao.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not permissao:
         raise HTTPException(
@@ -186,7 +192,7 @@ def revogar_permissao(
         )
     
     # Verifica se é o dono do item ou quem recebeu a permissão
-    item = db.query(ItemCofre).filter(ItemCofre.id == permissao.item_id).first()
+    item = await db.scalar(select(ItemCofre).where(ItemCofre.id == permissao.item_id))
     
     is_owner = item and item.user_id == current_user.id
     is_recipient = permissao.shared_with_user_id == current_user.id
@@ -198,4 +204,6 @@ def revogar_permissao(
         )
     
     permissao.soft_delete()
-    db.commit()
+    await db.commit()
+    AclService.invalidar_usuarios([permissao.shared_with_user_id])
+    CachePaginas.invalidar_usuarios([item and item.user_id, permissao.shared_with_user_id])
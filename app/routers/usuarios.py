@@ -2,54 +2,77 @@
 Router de Usuários - CRUD (apenas para admin, opcional)
 """
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioResponse
 from app.services.auth import get_current_active_user
+from app.services.replicas import get_db_leitura
+from app.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/usuarios", tags=["Usuários"])
 
 
 @router.get("", response_model=List[UsuarioResponse])
-def listar_usuarios(
+async def listar_usuarios(
+    response: Response,
     skip: int = Query(0, ge=0, description="Registros para pular"),
     limit: int = Query(100, ge=1, le=100, description="Limite de registros"),
+    cursor: str = Query(None, description="Cursor da próxima página (substitui skip)"),
     busca: str = Query(None, description="Buscar por nome ou email"),
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db_leitura)
 ):
     """
     Lista todos os usuários do sistema.
     Útil para selecionar com quem compartilhar um item.
+    Quando houver mais usuários, o cursor da próxima página vem no header X-Next-Cursor.
     """
-    query = db.query(Usuario).filter(Usuario.deleted_at.is_(None))
+    query = select(Usuario).where(Usuario.deleted_at.is_(None))
     
     if busca:
-        query = query.filter(
+        query = query.where(
             (Usuario.nome.ilike(f"%{busca}%")) |
             (Usuario.email.ilike(f"%{busca}%"))
         )
     
-    usuarios = query.offset(skip).limit(limit).all()
+    # Paginação por chave: continua após (nome, id) do último usuário
+    if cursor:
+        nome_c, id_c = decode_cursor(cursor, str, str)
+        query = query.where(or_(
+            Usuario.nome > nome_c,
+            and_(Usuario.nome == nome_c, Usuario.id > id_c)
+        ))
+    
+    query = query.order_by(Usuario.nome, Usuario.id)
+    if not cursor:
+        query = query.offset(skip)
+    
+    usuarios = (await db.scalars(query.limit(limit))).all()
+    
+    if len(usuarios) == limit:
+        ultimo = usuarios[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([ultimo.nome, ultimo.id])
+    
     return usuarios
 
 
 @router.get("/{usuario_id}", response_model=UsuarioResponse)
-def obter_usuario(
+async def obter_usuario(
     usuario_id: str,
     current_user: Usuario = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtém dados de um usuário específico.
     """
-    usuario = db.query(Usuario).filter(
+    usuario = await db.scalar(select(Usuario).where(
         Usuario.id == usuario_id,
         Usuario.deleted_at.is_(None)
-    ).first()
+    ))
     
     if not usuario:
         raise HTTPException(
@@ -14,12 +14,16 @@ from app.schemas.categoria import (
 )
 from app.schemas.item_cofre import (
     ItemCofreCreate, 
+    ItemCofreBulkCreate,
     ItemCofreUpdate, 
     ItemCofreResponse,
-    ItemCofreCompleto
+    ItemCofreCompleto,
+    VersaoCofreResponse,
+    SincronizacaoResponse
 )
 from app.schemas.campo_dinamico import (
     CampoDinamicoCreate,
+    CampoDinamicoItemUpdate,
     CampoDinamicoUpdate,
     CampoDinamicoResponse
 )
@@ -33,8 +37,9 @@ from app.schemas.auth import Token, TokenData
 __all__ = [
     "UsuarioCreate", "UsuarioUpdate", "UsuarioResponse", "UsuarioLogin",
     "CategoriaCreate", "CategoriaUpdate", "CategoriaResponse",
-    "ItemCofreCreate", "ItemCofreUpdate", "ItemCofreResponse", "ItemCofreCompleto",
-    "CampoDinamicoCreate", "CampoDinamicoUpdate", "CampoDinamicoResponse",
+    "ItemCofreCreate", "ItemCofreBulkCreate", "ItemCofreUpdate", "ItemCofreResponse", "ItemCofreCompleto",
+    "VersaoCofreResponse", "SincronizacaoResponse",
+    "CampoDinamicoCreate", "CampoDinamicoItemUpdate", "CampoDinamicoUpdate", "CampoDinamicoResponse",
     "PermissaoCreate", "PermissaoUpdate", "PermissaoResponse",
     "Token", "TokenData"
 ]
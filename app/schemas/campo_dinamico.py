@@ -21,6 +21,14 @@ class CampoDinamicoCreate(CampoDinamicoBase):
     pass
 
 
+class CampoDinamicoItemUpdate(CampoDinamicoBase):
+    """Schema de campo enviado na atualização do item (novo ou existente)"""
+    id: Optional[str] = Field(
+        None,
+        description="ID do campo existente (sem ID, o campo é associado pelo label)"
+    )
+
+
 class CampoDinamicoUpdate(BaseModel):
     """Schema para atualizar campo dinâmico"""
     label: Optional[str] = Field(None, min_length=1, max_length=100)
@@ -4,8 +4,13 @@ Schemas para Item do Cofre
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
-from app.schemas.campo_dinamico import CampoDinamicoCreate, CampoDinamicoResponse
+from app.schemas.campo_dinamico import (
+    CampoDinamicoCreate,
+    CampoDinamicoItemUpdate,
+    CampoDinamicoResponse
+)
 from app.schemas.categoria import CategoriaResponse
+from app.schemas.permissao import PermissaoResponse
 
 
 class ItemCofreBase(BaseModel):
@@ -24,13 +29,23 @@ class ItemCofreCreate(ItemCofreBase):
     )
 
 
+class ItemCofreBulkCreate(BaseModel):
+    """Schema para criar vários itens de uma vez (ex.: importação de outro cofre)"""
+    itens: List[ItemCofreCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=1000,
+        description="Itens a criar, em uma única transação"
+    )
+
+
 class ItemCofreUpdate(BaseModel):
     """Schema para atualizar item do cofre"""
     titulo: Optional[str] = Field(None, min_length=1, max_length=200)
     category_id: Optional[str] = None
     nota_adicional: Optional[str] = None
     favorito: Optional[bool] = None
-    campos: Optional[List[CampoDinamicoCreate]] = None
+    campos: Optional[List[CampoDinamicoItemUpdate]] = None
 
 
 class ItemCofreResponse(ItemCofreBase):
@@ -53,3 +68,17 @@ class ItemCofreCompleto(ItemCofreResponse):
     
     class Config:
         from_attributes = True
+
+
+class VersaoCofreResponse(BaseModel):
+    """Schema da versão do cofre do usuário"""
+    versao: str
+
+
+class SincronizacaoResponse(BaseModel):
+    """Schema das alterações do cofre desde o último token de sincronização"""
+    itens: List[ItemCofreCompleto] = []
+    itens_removidos: List[str] = []
+    permissoes: List[PermissaoResponse] = []
+    permissoes_removidas: List[str] = []
+    sync_token: Optional[str] = None
@@ -3,10 +3,12 @@ Serviços do Security Key
 """
 from app.services.auth import AuthService, get_current_user, get_current_active_user
 from app.services.crypto import CryptoService
+from app.services.metrics import Metrics
 
 __all__ = [
     "AuthService",
     "get_current_user",
     "get_current_active_user",
-    "CryptoService"
+    "CryptoService",
+    "Metrics"
 ]
@@ -0,0 +1,201 @@
+"""
+Serviço de Controle de Acesso - Nível de acesso de cada usuário aos itens
+
+O mapa de um usuário (item_id → "dono", "editar" ou "visualizar") é carregado
+em uma consulta e fica em memória (ACL_CACHE_TTL), junto com o carimbo dos
+compartilhamentos recebidos: quantidade e maior updated_at das permissões
+com destino ao usuário, ativas ou não (ix_permissoes_destino_updated).
+
+- Acesso de dono: decidido pelo mapa, sem consulta.
+- Acesso por compartilhamento, ou item já negado: decidido pelo mapa enquanto
+  o carimbo foi conferido há menos de ACL_CONFERENCIA_SEGUNDOS. Depois disso,
+  uma consulta pontual confere o carimbo (e o dono do item); se ele mudou
+  (compartilhamento novo, nível alterado ou revogação em outro processo),
+  o mapa é recarregado antes de decidir.
+- Item fora do mapa: a mesma consulta pontual. Com o carimbo igual, é negado
+  sem recarregar o mapa e fica entre os negados do mapa (ids inexistentes
+  não provocam a consulta completa); itens do próprio usuário criados em
+  outro processo entram no mapa.
+
+Compartilhar, alterar ou revogar descarta o mapa do destinatário neste processo
+(vale na hora); excluir um item descarta o mapa do dono e de quem o recebeu.
+As consultas usam a sessão da requisição (get_db, primário), nunca uma conexão
+a mais do pool nem uma réplica atrasada.
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.item_cofre import ItemCofre
+from app.models.permissao import NivelAcesso, Permissao
+from app.services.cache import TTLCache
+from app.services.metrics import Metrics
+
+settings = get_settings()
+
+NIVEL_DONO = "dono"
+
+# (quantidade, maior updated_at) das permissões recebidas pelo usuário
+Carimbo = Tuple[int, Optional[datetime]]
+
+# Ids negados guardados por mapa (ao passar do limite, a lista recomeça)
+LIMITE_NEGADOS = 1000
+
+
+@dataclass
+class MapaAcesso:
+    """Níveis de acesso do usuário, o carimbo lido com eles e quando foi conferido"""
+    niveis: Dict[str, str]
+    carimbo: Carimbo
+    conferido: float = field(default_factory=time.monotonic)
+    negados: Set[str] = field(default_factory=set)
+    
+    def recente(self) -> bool:
+        """Se o carimbo foi conferido há menos de ACL_CONFERENCIA_SEGUNDOS"""
+        return time.monotonic() - self.conferido < settings.ACL_CONFERENCIA_SEGUNDOS
+
+
+class AclService:
+    """Decisões de acesso aos itens a partir do mapa em memória de cada usuário"""
+    
+    _mapas = TTLCache(maxsize=settings.ACL_CACHE_SIZE, ttl=settings.ACL_CACHE_TTL)
+    # Muda a cada invalidação: um mapa lido antes dela não é guardado
+    _invalidacoes = 0
+    
+    @staticmethod
+    def _consulta(user_id: str):
+        """Itens próprios e compartilhados com o usuário, com o nível, em uma consulta"""
+        proprios = select(ItemCofre.id, literal(NIVEL_DONO)).where(
+            ItemCofre.user_id == user_id,
+            ItemCofre.deleted_at.is_(None)
+        )
+        recebidos = select(Permissao.item_id, Permissao.nivel_acesso).join(
+            ItemCofre, ItemCofre.id == Permissao.item_id
+        ).where(
+            Permissao.shared_with_user_id == user_id,
+            Permissao.deleted_at.is_(None),
+            ItemCofre.deleted_at.is_(None)
+        )
+        return union_all(proprios, recebidos)
+    
+    @staticmethod
+    def _consulta_carimbo(user_id: str):
+        """Carimbo dos compartilhamentos recebidos (só o índice do destino)"""
+        return select(
+            func.count(Permissao.id),
+            func.max(Permissao.updated_at)
+        ).where(Permissao.shared_with_user_id == user_id)
+    
+    @classmethod
+    async def _carregar(cls, db: AsyncSession, user_id: str) -> MapaAcesso:
+        """Lê o carimbo e o mapa do usuário na sessão da requisição e os guarda"""
+        Metrics.incrementar("acl.load")
+        invalidacoes = cls._invalidacoes
+        # Carimbo antes do mapa: uma mudança entre os dois leva a uma nova recarga
+        carimbo = tuple((await db.execute(cls._consulta_carimbo(user_id))).one())
+        niveis = dict((await db.execute(cls._consulta(user_id))).all())
+        
+        mapa = MapaAcesso(niveis, carimbo)
+        if invalidacoes == cls._invalidacoes:
+            cls._mapas.set(user_id, mapa)
+        return mapa
+    
+    @classmethod
+    async def _conferir(
+        cls,
+        db: AsyncSession,
+        item_id: str,
+        user_id: str
+    ) -> Tuple[Optional[str], Carimbo]:
+        """Dono do item (se ativo) e carimbo atual do usuário, em uma consulta pontual"""
+        Metrics.incrementar("acl.check")
+        dono = select(ItemCofre.user_id).where(
+            ItemCofre.id == item_id,
+            ItemCofre.deleted_at.is_(None)
+        ).scalar_subquery()
+        carimbo = cls._consulta_carimbo(user_id).subquery()
+        linha = (await db.execute(select(dono, *carimbo.c))).one()
+        return linha[0], tuple(linha[1:])
+    
+    @classmethod
+    async def nivel(cls, db: AsyncSession, item_id: str, user_id: str) -> Optional[str]:
+        """
+        Nível de acesso do usuário ao item ("dono", "editar", "visualizar") ou None.
+        db é a sessão da requisição (primário), usada só quando o mapa não basta.
+        """
+        mapa = cls._mapas.get(user_id)
+        if mapa is None:
+            return (await cls._carregar(db, user_id)).niveis.get(item_id)
+        
+        nivel = mapa.niveis.get(item_id)
+        if nivel == NIVEL_DONO:
+            return nivel
+        
+        # Compartilhado ou já negado, com o carimbo conferido há pouco: pela memória
+        if mapa.recente() and (nivel is not None or item_id in mapa.negados):
+            return nivel
+        
+        # Confere se algo mudou desde a leitura do mapa
+        dono, carimbo = await cls._conferir(db, item_id, user_id)
+        if carimbo != mapa.carimbo:
+            return (await cls._carregar(db, user_id)).niveis.get(item_id)
+        
+        mapa.conferido = time.monotonic()
+        if nivel is None and dono == user_id:
+            # Criado em outro processo
+            mapa.niveis[item_id] = NIVEL_DONO
+            return NIVEL_DONO
+        
+        if nivel is None:
+            Metrics.incrementar("acl.denied_without_reload")
+            if len(mapa.negados) >= LIMITE_NEGADOS:
+                mapa.negados.clear()
+            mapa.negados.add(item_id)
+        return nivel
+    
+    @classmethod
+    async def pode_ver(cls, db: AsyncSession, item_id: str, user_id: str) -> bool:
+        """Se o usuário é dono do item ou o recebeu"""
+        return await cls.nivel(db, item_id, user_id) is not None
+    
+    @classmethod
+    async def pode_editar(cls, db: AsyncSession, item_id: str, user_id: str) -> bool:
+        """Se o usuário é dono do item ou o recebeu com permissão de edição"""
+        return await cls.nivel(db, item_id, user_id) in (NIVEL_DONO, NivelAcesso.EDITAR.value)
+    
+    @classmethod
+    def registrar_itens(cls, user_id: str, item_ids: Iterable[str]) -> None:
+        """Inclui itens recém-criados no mapa do dono, se estiver carregado"""
+        mapa = cls._mapas.get(user_id)
+        if mapa is not None:
+            mapa.niveis.update(dict.fromkeys(item_ids, NIVEL_DONO))
+    
+    @classmethod
+    def invalidar_usuarios(cls, user_ids: Iterable[str]) -> None:
+        """Descarta os mapas dos usuários"""
+        cls._invalidacoes += 1
+        for user_id in user_ids:
+            if user_id:
+                cls._mapas.pop(user_id)
+    
+    @classmethod
+    async def invalidar_item(cls, db: AsyncSession, item_id: str) -> Set[str]:
+        """
+        Descarta os mapas do dono e de todos com quem o item está compartilhado.
+        Retorna esses usuários.
+        """
+        usuarios = set((await db.scalars(
+            select(ItemCofre.user_id).where(ItemCofre.id == item_id).union(
+                select(Permissao.shared_with_user_id).where(
+                    Permissao.item_id == item_id,
+                    Permissao.deleted_at.is_(None)
+                )
+            )
+        )).all())
+        cls.invalidar_usuarios(usuarios)
+        return usuarios
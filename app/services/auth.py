@@ -1,27 +1,169 @@
 """
 Serviço de Autenticação - JWT e Hash de Senhas
 """
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import partial
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from app.config import get_settings
 from app.database import get_db
 from app.models.usuario import Usuario
 from app.schemas.auth import TokenData
+from app.services.cache import TTLCache
+from app.services.metrics import Metrics
 
 settings = get_settings()
 
 # Contexto para hash de senhas com bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes com custo menor que o configurado são regravados no próximo login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 # OAuth2 para extrair token do header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Tokens já verificados: sha256 do token -> TokenData, até o "exp" do token
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+# Usuários autenticados recentemente (cópias desanexadas da sessão), por id
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+# Muda a cada invalidação: um usuário lido antes dela não é guardado
+_invalidacoes = 0
+
+# Ids dos usuários gravados na transação (session.info), invalidados após o commit;
+# TODOS_USUARIOS marca um update/delete em lote, sem ids conhecidos
+USUARIOS_GRAVADOS = "usuarios_gravados"
+TODOS_USUARIOS = "*"
+
+
+def _snapshot_usuario(user: Usuario) -> Usuario:
+    """Cópia do usuário com as colunas carregadas, fora de qualquer sessão"""
+    copia = Usuario(**{c.key: getattr(user, c.key) for c in Usuario.__table__.columns})
+    make_transient_to_detached(copia)
+    return copia
+
+
+def invalidar_usuario(user_id: str) -> None:
+    """Remove o usuário do cache (perfil alterado, desativado ou excluído)"""
+    global _invalidacoes
+    _invalidacoes += 1
+    if user_id == TODOS_USUARIOS:
+        user_cache.clear()
+    else:
+        user_cache.pop(user_id)
+
+
+def _usuarios_gravados(session: Session) -> set:
+    """Ids gravados na transação atual da sessão"""
+    return session.info.setdefault(USUARIOS_GRAVADOS, set())
+
+
+@event.listens_for(Session, "after_flush")
+def _coletar_usuarios_gravados(session, flush_context):
+    """Guarda os usuários alterados ou excluídos no flush (listas ainda anteriores a ele)"""
+    ids = {
+        obj.id for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, Usuario)
+    }
+    if ids:
+        _usuarios_gravados(session).update(ids)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _coletar_update_usuarios(orm_execute_state):
+    """update()/delete() de Usuario em lote: todo o cache é invalidado após o commit"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if any(mapper.class_ is Usuario for mapper in orm_execute_state.all_mappers):
+        _usuarios_gravados(orm_execute_state.session).add(TODOS_USUARIOS)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidar_usuarios_gravados(session):
+    """
+    Invalida o cache só depois do commit: uma requisição concorrente que leia
+    o usuário antes dele não volta a guardar a versão antiga
+    (ver _invalidacoes em get_current_user).
+    """
+    for user_id in session.info.pop(USUARIOS_GRAVADOS, ()):
+        invalidar_usuario(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_usuarios_gravados(session):
+    """Nada foi gravado: descarta os ids coletados"""
+    session.info.pop(USUARIOS_GRAVADOS, None)
+
+
+class PasswordHasher:
+    """
+    Executa o bcrypt (lento por definição) fora do event loop, em um pool
+    dedicado e limitado. Acima da fila configurada, responde 503 em vez de
+    ocupar o threadpool usado pelas demais rotas.
+    """
+    
+    _executor: ThreadPoolExecutor = None
+    _vagas = threading.BoundedSemaphore(
+        settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE
+    )
+    
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """Retorna o pool de threads do bcrypt (singleton)"""
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="bcrypt"
+            )
+        return cls._executor
+    
+    @classmethod
+    async def _executar(cls, func, *args):
+        """Agenda a função no pool, se houver vaga na fila"""
+        if not cls._vagas.acquire(blocking=False):
+            Metrics.incrementar("auth.password_hash_rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente em instantes",
+                headers={"Retry-After": "1"},
+            )
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(cls._get_executor(), partial(func, *args))
+        finally:
+            cls._vagas.release()
+    
+    @classmethod
+    async def hash(cls, password: str) -> str:
+        """Gera hash da senha"""
+        return await cls._executar(pwd_context.hash, password)
+    
+    @classmethod
+    async def verify_and_update(
+        cls, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica a senha. Se o hash estiver com custo desatualizado,
+        retorna também o novo hash.
+        """
+        return await cls._executar(pwd_context.verify_and_update, plain_password, hashed_password)
+
 
 class AuthService:
     """Serviço de autenticação"""
@@ -58,7 +200,16 @@ class AuthService:
     
     @staticmethod
     def decode_token(token: str) -> Optional[TokenData]:
-        """Decodifica e valida token JWT"""
+        """
+        Decodifica e valida token JWT.
+        Tokens válidos ficam em cache até expirarem, evitando verificar
+        a assinatura de novo a cada requisição.
+        """
+        chave = hashlib.sha256(token.encode()).digest()
+        cached = token_cache.get(chave)
+        if cached is not None:
+            return cached
+        
         try:
             payload = jwt.decode(
                 token, 
@@ -70,29 +221,44 @@ class AuthService:
             
             if user_id is None:
                 return None
-                
-            return TokenData(user_id=user_id, email=email)
+            
+            token_data = TokenData(user_id=user_id, email=email)
         except JWTError:
             return None
+        
+        # Nunca guarda além do "exp" do próprio token
+        restante = payload.get("exp", 0) - time.time()
+        if restante > 0:
+            token_cache.set(chave, token_data, ttl=min(settings.TOKEN_CACHE_TTL, restante))
+        return token_data
     
     @staticmethod
-    def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuario]:
-        """Autentica usuário por email e senha"""
-        user = db.query(Usuario).filter(
+    async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[Usuario]:
+        """
+        Autentica usuário por email e senha.
+        Atualiza o hash da senha se o custo configurado tiver mudado.
+        """
+        user = await db.scalar(select(Usuario).where(
             Usuario.email == email,
             Usuario.deleted_at.is_(None)
-        ).first()
+        ))
         
         if not user:
             return None
-        if not AuthService.verify_password(password, user.password_hash):
+        
+        valida, novo_hash = await PasswordHasher.verify_and_update(password, user.password_hash)
+        if not valida:
             return None
+        
+        if novo_hash:
+            user.password_hash = novo_hash
+            await db.commit()
         return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Usuario:
     """
     Dependency para obter o usuário atual a partir do token.
@@ -108,14 +274,26 @@ async def get_current_user(
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(Usuario).filter(
+    # Autor das gravações desta sessão (leituras seguintes vão ao primário)
+    db.info["user_id"] = token_data.user_id
+    
+    cached = user_cache.get(token_data.user_id)
+    if cached is not None:
+        # Anexa uma cópia à sessão da requisição, sem consultar o banco
+        Metrics.incrementar("auth.user_cache_hit")
+        return await db.merge(cached, load=False)
+    
+    invalidacoes = _invalidacoes
+    user = await db.scalar(select(Usuario).where(
         Usuario.id == token_data.user_id,
         Usuario.deleted_at.is_(None)
-    ).first()
+    ))
     
     if user is None:
         raise credentials_exception
     
+    if invalidacoes == _invalidacoes:
+        user_cache.set(user.id, _snapshot_usuario(user))
     return user
 
 
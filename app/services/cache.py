@@ -0,0 +1,103 @@
+"""
+Serviço de Cache - Cache em memória com expiração e descarte LRU
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Cache em memória do processo, seguro para threads.
+    Cada entrada expira após o TTL; ao atingir o tamanho máximo,
+    a entrada usada há mais tempo é descartada.
+    on_evict(chave, valor), se informado, é chamado para toda entrada que sai
+    do cache (expiração, descarte, substituição, pop ou clear), fora do lock.
+    """
+    
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+        self._dados: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+    
+    def _descartar(self, removidos: List[Tuple[Hashable, Any]]) -> None:
+        """Avisa o on_evict das entradas removidas"""
+        if self.on_evict is None:
+            return
+        for key, valor in removidos:
+            self.on_evict(key, valor)
+    
+    @property
+    def ativo(self) -> bool:
+        """Cache com tamanho ou TTL zero fica desligado"""
+        return self.maxsize > 0 and self.ttl > 0
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor se existir e não tiver expirado"""
+        with self._lock:
+            entrada = self._dados.get(key)
+            if entrada is None:
+                return default
+            expira_em, valor = entrada
+            if expira_em > time.monotonic():
+                self._dados.move_to_end(key)
+                return valor
+            del self._dados[key]
+        
+        self._descartar([(key, valor)])
+        return default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda um valor; ttl sobrescreve o TTL padrão para esta entrada"""
+        if not self.ativo:
+            return
+        
+        expira_em = time.monotonic() + (self.ttl if ttl is None else ttl)
+        removidos = []
+        with self._lock:
+            anterior = self._dados.get(key)
+            if anterior is not None and anterior[1] is not value:
+                removidos.append((key, anterior[1]))
+            self._dados[key] = (expira_em, value)
+            self._dados.move_to_end(key)
+            while len(self._dados) > self.maxsize:
+                chave, (_, valor) = self._dados.popitem(last=False)
+                removidos.append((chave, valor))
+        
+        self._descartar(removidos)
+    
+    def pop(self, key: Hashable) -> None:
+        """Remove uma entrada, se existir"""
+        with self._lock:
+            entrada = self._dados.pop(key, None)
+        
+        if entrada is not None:
+            self._descartar([(key, entrada[1])])
+    
+    def pop_where(self, predicado: Callable[[Hashable], bool]) -> int:
+        """Remove as entradas cuja chave atende ao predicado; retorna quantas saíram"""
+        with self._lock:
+            chaves = [key for key in self._dados if predicado(key)]
+            removidos = [(key, self._dados.pop(key)[1]) for key in chaves]
+        
+        self._descartar(removidos)
+        return len(removidos)
+    
+    def clear(self) -> None:
+        """Remove todas as entradas"""
+        with self._lock:
+            removidos = [(key, valor) for key, (_, valor) in self._dados.items()]
+            self._dados.clear()
+        
+        self._descartar(removidos)
+    
+    def __len__(self) -> int:
+        return len(self._dados)
@@ -0,0 +1,100 @@
+"""
+Serviço de Cache de Categorias - Lista de categorias sem consultar o banco
+
+As categorias globais (criadas na subida da aplicação, não editáveis pela API)
+são lidas uma vez por processo e guardadas já serializadas, em uma tupla
+imutável ordenada por nome. As categorias próprias de cada usuário ficam em um
+cache curto (CATEGORIAS_CACHE_TTL), junto com a resposta pronta e sua versão.
+Criar, alterar ou excluir uma categoria descarta o cache do usuário neste
+processo; nos demais, a entrada expira pelo TTL.
+"""
+import hashlib
+import heapq
+from typing import List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.categoria import Categoria
+from app.schemas.categoria import CategoriaResponse
+from app.services.cache import TTLCache
+from app.services.metrics import Metrics
+
+settings = get_settings()
+
+_categoria_json = TypeAdapter(CategoriaResponse)
+
+# (nome, JSON da categoria), na ordem da listagem
+Fragmentos = Tuple[Tuple[str, bytes], ...]
+
+
+def _serializar(categorias: List[Categoria]) -> Fragmentos:
+    """Serializa cada categoria uma vez, ordenadas por nome"""
+    return tuple(sorted(
+        (categoria.nome, _categoria_json.dump_json(CategoriaResponse.model_validate(categoria)))
+        for categoria in categorias
+    ))
+
+
+class CacheCategorias:
+    """Categorias globais pré-serializadas e cache por usuário das próprias"""
+    
+    _globais: Optional[Fragmentos] = None
+    _usuarios = TTLCache(maxsize=settings.CATEGORIAS_CACHE_SIZE, ttl=settings.CATEGORIAS_CACHE_TTL)
+    # Muda a cada invalidação: uma leitura feita antes dela não é guardada
+    _invalidacoes = 0
+    
+    @classmethod
+    def ativo(cls) -> bool:
+        """Se o cache está ligado"""
+        return cls._usuarios.ativo
+    
+    @classmethod
+    async def _carregar_globais(cls, db: AsyncSession) -> Fragmentos:
+        """Lê as categorias globais na primeira vez e as mantém no processo"""
+        if cls._globais is None:
+            cls._globais = _serializar((await db.scalars(select(Categoria).where(
+                Categoria.usuario_id.is_(None),
+                Categoria.deleted_at.is_(None)
+            ))).all())
+        return cls._globais
+    
+    @classmethod
+    async def obter(cls, db: AsyncSession, user_id: str) -> Tuple[bytes, str]:
+        """
+        JSON da lista de categorias do usuário (globais e próprias, por nome)
+        e a versão desse conteúdo. Com o cache quente, não consulta o banco.
+        """
+        cached = cls._usuarios.get(user_id)
+        if cached is not None:
+            Metrics.incrementar("categorias.cache_hit")
+            return cached
+        
+        Metrics.incrementar("categorias.cache_miss")
+        invalidacoes = cls._invalidacoes
+        globais = await cls._carregar_globais(db)
+        proprias = _serializar((await db.scalars(select(Categoria).where(
+            Categoria.usuario_id == user_id,
+            Categoria.deleted_at.is_(None)
+        ))).all())
+        
+        corpo = b"[" + b",".join(json for _, json in heapq.merge(globais, proprias)) + b"]"
+        resultado = (corpo, hashlib.sha256(corpo).hexdigest()[:32])
+        if invalidacoes == cls._invalidacoes:
+            cls._usuarios.set(user_id, resultado)
+        return resultado
+    
+    @classmethod
+    def invalidar(cls, user_id: str) -> None:
+        """Descarta a lista do usuário (após criar, alterar ou excluir categoria)"""
+        cls._invalidacoes += 1
+        cls._usuarios.pop(user_id)
+    
+    @classmethod
+    def recarregar_globais(cls) -> None:
+        """Descarta as globais e todas as listas (ex.: após criar as categorias padrão)"""
+        cls._invalidacoes += 1
+        cls._globais = None
+        cls._usuarios.clear()
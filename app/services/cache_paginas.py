@@ -0,0 +1,110 @@
+"""
+Serviço de Cache de Páginas - Páginas de itens já descriptografadas, por usuário
+
+Opcional (ITENS_PAGE_CACHE_SIZE=0 desliga, o padrão). Cada entrada é o JSON de
+uma página de listar_itens, guardado em um bytearray na memória do processo:
+nunca vai para um cache compartilhado, e o conteúdo é zerado quando a entrada
+sai do cache (expiração, descarte, invalidação ou encerramento).
+
+Limite: só a cópia guardada no cache é zerada. O JSON gerado na primeira
+leitura e a cópia enviada em cada acerto são bytes imutáveis, liberados (mas
+não zerados) ao fim da resposta, como os valores descriptografados em qualquer
+outra rota. A resposta não usa a própria entrada (memoryview): uma invalidação
+durante o envio zeraria o corpo ainda não transmitido.
+
+A chave inclui a versão do cofre do usuário (a mesma do ETag): uma página de
+uma versão anterior nunca é servida, mesmo em outro processo. As gravações em
+itens, campos e permissões invalidam as páginas de todos os usuários que veem
+o item, para que o texto aberto não fique na memória até o TTL.
+"""
+from typing import Hashable, Iterable, Optional, Set, Tuple
+
+from fastapi import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.item_cofre import ItemCofre
+from app.models.permissao import Permissao
+from app.services.cache import TTLCache
+from app.services.metrics import Metrics
+from app.services.serializacao import Serializador
+
+settings = get_settings()
+
+def _zerar(chave: Hashable, pagina: Tuple[bytearray, dict]) -> None:
+    """Apaga o conteúdo da página que saiu do cache"""
+    corpo, _ = pagina
+    corpo[:] = bytes(len(corpo))
+
+
+_paginas = TTLCache(
+    maxsize=settings.ITENS_PAGE_CACHE_SIZE,
+    ttl=settings.ITENS_PAGE_CACHE_TTL,
+    on_evict=_zerar
+)
+
+
+class CachePaginas:
+    """Cache das páginas de itens de cada usuário"""
+    
+    @staticmethod
+    def ativo() -> bool:
+        """Se o cache está ligado"""
+        return _paginas.ativo
+    
+    @staticmethod
+    def obter(user_id: str, etag: str, headers: dict) -> Optional[Response]:
+        """
+        Resposta com a página guardada para o usuário e o ETag (versão + filtros),
+        com os headers informados. None se não houver.
+        O corpo é uma cópia (não zerada ao fim do envio; ver o limite no módulo).
+        """
+        pagina = _paginas.get((user_id, etag))
+        if pagina is None:
+            Metrics.incrementar("itens.page_cache_miss")
+            return None
+        
+        Metrics.incrementar("itens.page_cache_hit")
+        corpo, headers_pagina = pagina
+        return Response(
+            content=bytes(corpo),
+            media_type="application/json",
+            headers={**headers, **headers_pagina}
+        )
+    
+    @staticmethod
+    async def guardar(user_id: str, etag: str, itens: list, headers: dict) -> Response:
+        """Serializa a página uma vez (fora do event loop), guarda e retorna a resposta"""
+        corpo = await Serializador.itens_async(itens)
+        _paginas.set((user_id, etag), (bytearray(corpo), dict(headers)))
+        return Response(content=corpo, media_type="application/json", headers=headers)
+    
+    @staticmethod
+    def invalidar_usuarios(user_ids: Iterable[str]) -> None:
+        """Descarta (e zera) as páginas dos usuários"""
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if user_ids and _paginas.ativo:
+            _paginas.pop_where(lambda chave: chave[0] in user_ids)
+    
+    @classmethod
+    async def invalidar_itens(cls, db: AsyncSession, item_ids: Iterable[str]) -> None:
+        """Descarta as páginas do dono e de todos com quem os itens estão compartilhados"""
+        item_ids = list(item_ids)
+        if not item_ids or not _paginas.ativo:
+            return
+        
+        usuarios: Set[str] = set((await db.scalars(
+            select(ItemCofre.user_id).where(ItemCofre.id.in_(item_ids)).union(
+                select(Permissao.shared_with_user_id).where(
+                    Permissao.item_id.in_(item_ids),
+                    Permissao.deleted_at.is_(None)
+                )
+            )
+        )).all())
+        cls.invalidar_usuarios(usuarios)
+    
+    @staticmethod
+    def limpar() -> None:
+        """Descarta (e zera) todas as páginas"""
+        _paginas.clear()
@@ -2,82 +2,222 @@
 Serviço de Criptografia - Para campos sensíveis
 """
 import base64
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+import os
+from typing import Iterable, List, Optional, Sequence, Tuple
+from fastapi.concurrency import run_in_threadpool
 from app.config import get_settings
+from app.services.keyring import CHAVE_PADRAO, KeyRing
+from app.services.metrics import Metrics
 
 settings = get_settings()
 
+# Envelope versionado: "<versão>[.<id da chave>]:<token>"
+# v1 -> token Fernet puro (sem a camada extra de base64 do formato legado)
+# v2 -> nonce (12 bytes) + texto cifrado AES-GCM, em base64 urlsafe
+# Sem id da chave, o valor usa a chave padrão do KeyRing.
+# Valores sem prefixo estão no formato legado: base64(token Fernet), chave padrão
+VERSAO_FERNET = "v1"
+VERSAO_AESGCM = "v2"
+CIFRAS = {"fernet": VERSAO_FERNET, "aesgcm": VERSAO_AESGCM}
+
+# Todo token Fernet começa com "gAAAAA" (versão 0x80 + timestamp);
+# no formato legado esse trecho vira "Z0FBQUFB" após o base64 externo
+PREFIXO_LEGADO = "Z0FBQUFB"
+MARCADORES = (
+    f"{VERSAO_FERNET}:", f"{VERSAO_FERNET}.",
+    f"{VERSAO_AESGCM}:", f"{VERSAO_AESGCM}.",
+    PREFIXO_LEGADO,
+)
+
 
 class CryptoService:
     """
     Serviço para criptografar e descriptografar valores sensíveis.
-    Usa Fernet (AES 128-bit) para criptografia simétrica.
+    Usa Fernet (AES 128-bit) ou AES-GCM (256-bit) para criptografia simétrica,
+    com as chaves do KeyRing.
     """
     
-    _fernet: Fernet = None
+    @classmethod
+    def _versao_atual(cls) -> str:
+        """Versão do envelope usada nas novas gravações"""
+        return CIFRAS.get(settings.CRYPTO_CIPHER, VERSAO_FERNET)
     
     @classmethod
-    def _get_fernet(cls) -> Fernet:
-        """Retorna instância do Fernet (singleton)"""
-        if cls._fernet is None:
-            # Deriva uma chave de 32 bytes a partir da chave de configuração
-            kdf = PBKDF2HMAC(
-                algorithm=hashes.SHA256(),
-                length=32,
-                salt=b"security_key_salt",  # Em produção, use um salt único
-                iterations=100000,
-            )
-            key = base64.urlsafe_b64encode(
-                kdf.derive(settings.ENCRYPTION_KEY.encode())
-            )
-            cls._fernet = Fernet(key)
-        return cls._fernet
+    def _prefixo_atual(cls) -> str:
+        """Prefixo completo (versão e chave) das novas gravações"""
+        kid = KeyRing.primaria().kid
+        if kid == CHAVE_PADRAO:
+            return f"{cls._versao_atual()}:"
+        return f"{cls._versao_atual()}.{kid}:"
+    
+    @staticmethod
+    def _abrir_envelope(value: str) -> Tuple[str, str, str]:
+        """Separa versão, id da chave e token de um valor criptografado"""
+        if value.startswith(PREFIXO_LEGADO):
+            return "", CHAVE_PADRAO, value
+        
+        cabecalho, _, token = value.partition(":")
+        versao, _, kid = cabecalho.partition(".")
+        return versao, kid or CHAVE_PADRAO, token
+    
+    @classmethod
+    def _encrypt_value(cls, value: str) -> str:
+        """Criptografa um valor não vazio no formato atual, com a chave primária"""
+        chave = KeyRing.primaria()
+        prefixo = cls._prefixo_atual()
+        
+        if cls._versao_atual() == VERSAO_AESGCM:
+            nonce = os.urandom(12)
+            encrypted = chave.aesgcm.encrypt(nonce, value.encode(), None)
+            return prefixo + base64.urlsafe_b64encode(nonce + encrypted).decode()
+        
+        return prefixo + chave.fernet.encrypt(value.encode()).decode()
+    
+    @classmethod
+    def _decrypt_value(cls, value: str) -> str:
+        """
+        Descriptografa um valor não vazio em qualquer formato conhecido.
+        Lança exceção se o valor não puder ser descriptografado.
+        """
+        versao, kid, token = cls._abrir_envelope(value)
+        chave = KeyRing.get(kid)
+        
+        if versao == VERSAO_FERNET:
+            return chave.fernet.decrypt(token).decode()
+        
+        if versao == VERSAO_AESGCM:
+            raw = base64.urlsafe_b64decode(token)
+            return chave.aesgcm.decrypt(raw[:12], raw[12:], None).decode()
+        
+        if versao == "":
+            # Formato legado
+            return chave.fernet.decrypt(base64.urlsafe_b64decode(token)).decode()
+        
+        raise ValueError(f"Versão de envelope desconhecida: {versao!r}")
     
     @classmethod
     def encrypt(cls, value: str) -> str:
         """
         Criptografa um valor string.
-        Retorna o valor criptografado em base64.
+        Retorna o valor no envelope versionado.
         """
         if not value:
             return value
         
-        fernet = cls._get_fernet()
-        encrypted = fernet.encrypt(value.encode())
-        return base64.urlsafe_b64encode(encrypted).decode()
+        return cls._encrypt_value(value)
     
     @classmethod
     def decrypt(cls, encrypted_value: str) -> str:
         """
-        Descriptografa um valor criptografado.
+        Descriptografa um valor criptografado (formato atual ou legado).
         Retorna o valor original.
         """
         if not encrypted_value:
             return encrypted_value
         
+        if not encrypted_value.startswith(MARCADORES):
+            # Texto puro gravado antes da criptografia: devolve sem tentar abrir
+            Metrics.incrementar("crypto.plaintext_fallback")
+            return encrypted_value
+        
         try:
-            fernet = cls._get_fernet()
-            decoded = base64.urlsafe_b64decode(encrypted_value.encode())
-            decrypted = fernet.decrypt(decoded)
-            return decrypted.decode()
+            return cls._decrypt_value(encrypted_value)
         except Exception:
-            # Se falhar, retorna o valor original (pode não estar criptografado)
+            # Tem o formato, mas não abre com a chave atual
+            Metrics.incrementar("crypto.decrypt_failure")
             return encrypted_value
     
     @classmethod
-    def is_encrypted(cls, value: str) -> bool:
-        """
-        Tenta verificar se um valor está criptografado.
-        """
+    def needs_rewrap(cls, value: str) -> bool:
+        """Indica se o valor não está gravado no formato atual"""
         if not value:
             return False
+        return not value.startswith(cls._prefixo_atual())
+    
+    @classmethod
+    def rewrap(cls, value: str) -> Optional[str]:
+        """
+        Regrava um valor criptografado no formato atual.
+        Retorna None se o valor não puder ser descriptografado.
+        """
+        if not cls.is_encrypted(value):
+            return None
         
         try:
-            decoded = base64.urlsafe_b64decode(value.encode())
-            fernet = cls._get_fernet()
-            fernet.decrypt(decoded)
-            return True
+            return cls._encrypt_value(cls._decrypt_value(value))
         except Exception:
+            return None
+    
+    @classmethod
+    def encrypt_many(cls, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """
+        Criptografa uma lista de valores de uma vez.
+        Mantém a ordem e devolve valores vazios sem alteração.
+        """
+        return [cls._encrypt_value(value) if value else value for value in values]
+    
+    @classmethod
+    def decrypt_many(cls, encrypted_values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """
+        Descriptografa uma lista de valores de uma vez.
+        Valores que não puderem ser descriptografados voltam como estão.
+        """
+        return [cls.decrypt(value) for value in encrypted_values]
+    
+    @classmethod
+    def decrypt_campos(cls, campos: Iterable) -> None:
+        """
+        Descriptografa, em lote, os valores sensíveis de uma lista de campos.
+        Os valores são substituídos no próprio objeto.
+        """
+        sensiveis = [c for c in campos if c.is_sensitive and c.value]
+        if not sensiveis:
+            return
+        
+        valores = cls.decrypt_many([c.value for c in sensiveis])
+        for campo, valor in zip(sensiveis, valores):
+            campo.value = valor
+    
+    @classmethod
+    async def encrypt_many_async(cls, values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """
+        encrypt_many fora do event loop (threadpool das rotas).
+        Usar nas rotas assíncronas: um lote grande não trava as demais requisições.
+        """
+        values = list(values)
+        if not any(values):
+            return values
+        return await run_in_threadpool(cls.encrypt_many, values)
+    
+    @classmethod
+    async def decrypt_many_async(cls, encrypted_values: Sequence[Optional[str]]) -> List[Optional[str]]:
+        """decrypt_many fora do event loop (threadpool das rotas)"""
+        encrypted_values = list(encrypted_values)
+        if not any(encrypted_values):
+            return encrypted_values
+        return await run_in_threadpool(cls.decrypt_many, encrypted_values)
+    
+    @classmethod
+    async def decrypt_campos_async(cls, campos: Iterable) -> None:
+        """
+        decrypt_campos com a descriptografia fora do event loop.
+        Os objetos são alterados de volta no loop, não na thread.
+        """
+        sensiveis = [c for c in campos if c.is_sensitive and c.value]
+        if not sensiveis:
+            return
+        
+        valores = await cls.decrypt_many_async([c.value for c in sensiveis])
+        for campo, valor in zip(sensiveis, valores):
+            campo.value = valor
+    
+    @classmethod
+    def is_encrypted(cls, value: str) -> bool:
+        """
+        Verifica se um valor está criptografado pelo marcador de formato.
+        Não descriptografa o valor.
+        """
+        if not value:
             return False
+        
+        return value.startswith(MARCADORES)
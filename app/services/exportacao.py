@@ -0,0 +1,106 @@
+"""
+Serviço de Exportação - Cofre inteiro em NDJSON, gerado em blocos
+
+Uma linha JSON por item (formato de ItemCofreCompleto), opcionalmente em gzip.
+Os itens vêm de um cursor no servidor (yield_per) e são processados em blocos
+de EXPORT_CHUNK_SIZE: cada bloco é convertido, descriptografado em um lote,
+serializado e enviado antes do próximo ser lido (no threadpool, fora do
+event loop). A memória usada depende do tamanho do bloco, não do tamanho
+do cofre.
+
+O gerador abre a própria sessão (a da requisição não acompanha a resposta
+em streaming) e não altera os objetos carregados: os valores são abertos
+nos dicionários da resposta, nunca nas entidades da sessão.
+"""
+import zlib
+from typing import AsyncIterator, List
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.config import get_settings
+from app.models.item_cofre import ItemCofre
+from app.schemas.item_cofre import ItemCofreCompleto
+from app.services.crypto import CryptoService
+from app.services.metrics import Metrics
+from app.services.replicas import fabrica_leitura
+from app.services.serializacao import campo_dict, categoria_dict, conversor, dumps
+
+settings = get_settings()
+
+# Campos removidos não fazem parte do cofre exportado
+_item_dict = conversor(
+    ItemCofreCompleto,
+    campos=lambda campos: [campo_dict(campo) for campo in campos if campo.deleted_at is None],
+    categoria=categoria_dict
+)
+
+
+def _bloco(itens: List[ItemCofre], gzip=None) -> bytes:
+    """
+    Linhas NDJSON de um bloco de itens do próprio usuário, já descriptografados
+    (compactadas e descarregadas, com gzip). Roda no threadpool, fora do event loop.
+    """
+    linhas = []
+    for item in itens:
+        item.dono_nome = "Você"
+        item.pode_editar = True
+        linhas.append(_item_dict(item))
+    
+    sensiveis = [
+        campo for dados in linhas for campo in dados["campos"]
+        if campo["is_sensitive"] and campo["value"]
+    ]
+    if sensiveis:
+        valores = CryptoService.decrypt_many([campo["value"] for campo in sensiveis])
+        for campo, valor in zip(sensiveis, valores):
+            campo["value"] = valor
+    
+    pedaco = b"".join(dumps(dados) + b"\n" for dados in linhas)
+    if gzip is not None:
+        pedaco = gzip.compress(pedaco) + gzip.flush(zlib.Z_SYNC_FLUSH)
+    return pedaco
+
+
+class ExportService:
+    """Exportação do cofre do usuário"""
+    
+    @staticmethod
+    def _consulta(user_id: str):
+        """Itens ativos do usuário, com campos e categoria, em ordem estável"""
+        return select(ItemCofre).options(
+            selectinload(ItemCofre.campos),
+            joinedload(ItemCofre.categoria)
+        ).where(
+            ItemCofre.user_id == user_id,
+            ItemCofre.deleted_at.is_(None)
+        ).order_by(ItemCofre.id).execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+    
+    @classmethod
+    async def ndjson(
+        cls,
+        user_id: str,
+        compactar: bool = False,
+        gravou: bool = False
+    ) -> AsyncIterator[bytes]:
+        """
+        Gera o NDJSON do cofre do usuário, um pedaço por bloco de itens.
+        Com compactar, o fluxo é gzip, descarregado a cada bloco.
+        Com gravou (escrita recente informada pelo cliente), lê do primário.
+        """
+        gzip = zlib.compressobj(wbits=31) if compactar else None
+        total = 0
+        
+        async with fabrica_leitura(user_id, gravou)() as db:
+            resultado = await db.stream(cls._consulta(user_id))
+            async for particao in resultado.scalars().partitions():
+                # Os objetos não são alterados: a sessão não os mantém após o bloco
+                pedaco = await run_in_threadpool(_bloco, particao, gzip)
+                total += len(particao)
+                if pedaco:
+                    yield pedaco
+        
+        if gzip is not None:
+            yield gzip.flush()
+        Metrics.incrementar("itens.exportados", total)
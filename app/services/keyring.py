@@ -0,0 +1,129 @@
+"""
+Serviço de Chaves - Key ring com as chaves de criptografia já derivadas
+
+Cada chave tem um id. A chave "0" é a chave padrão: é usada para os valores
+gravados sem id no envelope e, se não for informada já derivada em
+ENCRYPTION_KEYS, é derivada de ENCRYPTION_KEY com PBKDF2.
+
+Para gerar o valor já derivado da chave atual (e evitar o PBKDF2 na subida):
+
+    python -m app.cli derivar-chave
+
+Uma chave nova para rotação: python -m app.cli derivar-chave --id 2026a --perguntar
+"""
+import base64
+import threading
+from dataclasses import dataclass
+from typing import Dict
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from app.config import get_settings
+
+settings = get_settings()
+
+CHAVE_PADRAO = "0"
+
+
+@dataclass(frozen=True)
+class Chave:
+    """Chave derivada, com as instâncias de cifra prontas para uso"""
+    kid: str
+    fernet: Fernet
+    aesgcm: AESGCM
+
+
+def derivar_chave(segredo: str) -> bytes:
+    """Deriva a chave de 32 bytes a partir de um segredo (PBKDF2, lento)"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=b"security_key_salt",  # Em produção, use um salt único
+        iterations=100000,
+    )
+    return kdf.derive(segredo.encode())
+
+
+def _montar_chave(kid: str, material: bytes) -> Chave:
+    """Cria as instâncias Fernet e AES-GCM a partir da chave de 32 bytes"""
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"security_key aesgcm",
+    )
+    return Chave(
+        kid=kid,
+        fernet=Fernet(base64.urlsafe_b64encode(material)),
+        aesgcm=AESGCM(hkdf.derive(material)),
+    )
+
+
+def _parse_chaves(texto: str) -> Dict[str, bytes]:
+    """Lê ENCRYPTION_KEYS no formato "id:base64,id:base64" """
+    chaves = {}
+    for item in texto.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, _, valor = item.partition(":")
+        material = base64.urlsafe_b64decode(valor.strip())
+        if not kid or ":" in kid or "." in kid or len(material) != 32:
+            raise ValueError(f"Chave inválida em ENCRYPTION_KEYS: {kid!r}")
+        chaves[kid.strip()] = material
+    return chaves
+
+
+class KeyRing:
+    """
+    Conjunto de chaves de criptografia do processo.
+    Carregado na subida da aplicação; nenhuma derivação acontece nas requisições.
+    """
+    
+    _lock = threading.Lock()
+    _chaves: Dict[str, Chave] = None
+    _primaria: str = CHAVE_PADRAO
+    
+    @classmethod
+    def carregar(cls) -> None:
+        """Deriva ou carrega todas as chaves configuradas"""
+        with cls._lock:
+            if cls._chaves is not None:
+                return
+            
+            materiais = _parse_chaves(settings.ENCRYPTION_KEYS)
+            if CHAVE_PADRAO not in materiais and settings.ENCRYPTION_KEY:
+                materiais[CHAVE_PADRAO] = derivar_chave(settings.ENCRYPTION_KEY)
+            
+            primaria = settings.ENCRYPTION_PRIMARY_KEY_ID or CHAVE_PADRAO
+            if primaria not in materiais:
+                raise ValueError(f"Chave primária {primaria!r} não configurada")
+            
+            cls._chaves = {kid: _montar_chave(kid, m) for kid, m in materiais.items()}
+            cls._primaria = primaria
+    
+    @classmethod
+    def get(cls, kid: str) -> Chave:
+        """Retorna a chave pelo id (KeyError se não existir)"""
+        if cls._chaves is None:
+            cls.carregar()
+        return cls._chaves[kid]
+    
+    @classmethod
+    def primaria(cls) -> Chave:
+        """Retorna a chave usada nas novas gravações"""
+        if cls._chaves is None:
+            cls.carregar()
+        return cls._chaves[cls._primaria]
+    
+    @classmethod
+    def ids(cls) -> list:
+        """Ids das chaves carregadas"""
+        if cls._chaves is None:
+            cls.carregar()
+        return list(cls._chaves)
+
@@ -0,0 +1,44 @@
+"""
+Serviço de Métricas - Contadores simples em memória (por processo)
+"""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict
+
+
+class Metrics:
+    """
+    Registro de contadores da aplicação.
+    Os valores são expostos em /metrics.
+    """
+    
+    _lock = threading.Lock()
+    _contadores: Dict[str, int] = defaultdict(int)
+    _fontes: Dict[str, Callable[[], Dict[str, int]]] = {}
+    
+    @classmethod
+    def incrementar(cls, nome: str, valor: int = 1) -> None:
+        """Soma um valor ao contador"""
+        with cls._lock:
+            cls._contadores[nome] += valor
+    
+    @classmethod
+    def registrar_fonte(cls, prefixo: str, funcao: Callable[[], Dict[str, int]]) -> None:
+        """
+        Registra uma função que fornece valores lidos a cada snapshot
+        (ex.: estado de um pool), expostos como <prefixo>.<nome>.
+        """
+        with cls._lock:
+            cls._fontes[prefixo] = funcao
+    
+    @classmethod
+    def snapshot(cls) -> Dict[str, int]:
+        """Retorna uma cópia dos contadores atuais e dos valores das fontes"""
+        with cls._lock:
+            valores = dict(cls._contadores)
+            fontes = dict(cls._fontes)
+        
+        for prefixo, funcao in fontes.items():
+            for nome, valor in funcao().items():
+                valores[f"{prefixo}.{nome}"] = valor
+        return valores
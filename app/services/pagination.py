@@ -0,0 +1,42 @@
+"""
+Serviço de Paginação - Cursores opacos para paginação por chave (keyset)
+"""
+import base64
+import json
+from typing import Any, List
+
+from fastapi import HTTPException, status
+
+# Header com o cursor da próxima página
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(valores: List[Any]) -> str:
+    """Gera o cursor a partir da chave de ordenação do último registro"""
+    raw = json.dumps(valores, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *tipos: type) -> List[Any]:
+    """
+    Lê um cursor gerado por encode_cursor, com um valor de cada tipo informado
+    (ex.: decode_cursor(cursor, bool, str, str)).
+    Lança 400 se o cursor for inválido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(raw)
+    except ValueError:
+        valores = None
+    
+    # O tipo exato: um cursor montado à mão não chega à consulta (bool não vale por int)
+    if (
+        not isinstance(valores, list)
+        or len(valores) != len(tipos)
+        or any(type(valor) is not tipo for valor, tipo in zip(valores, tipos))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+    return valores
@@ -0,0 +1,127 @@
+"""
+Serviço de Réplicas - Roteamento das leituras entre o primário e as réplicas
+
+Rotas de consulta usam get_db_leitura: a sessão vem de uma réplica (em rodízio),
+exceto para o usuário que gravou algo há menos de REPLICA_STICKY_SECONDS, que
+continua lendo do primário e vê as próprias alterações. Gravações sempre usam
+get_db (primário). Leitura no primário (sem réplicas, ou após gravação) reutiliza
+a sessão get_db da requisição, já aberta por get_current_user: uma requisição
+nunca ocupa duas conexões do pool do primário.
+
+A marcação acompanha o cliente, para valer em qualquer processo: toda gravação
+bem-sucedida responde com o instante da escrita no header X-Last-Write e no
+cookie sk_ultima_escrita (que expira junto com a janela). Uma leitura com um
+dos dois dentro da janela vai ao primário, em qualquer worker. Cada processo
+também guarda os usuários que gravaram nele, para clientes que não devolvem
+nem o cookie nem o header.
+"""
+import itertools
+import time
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, ReplicaSessions, get_db
+from app.models.usuario import Usuario
+from app.services.auth import get_current_active_user
+from app.services.cache import TTLCache
+from app.services.metrics import Metrics
+
+settings = get_settings()
+
+# Usuários com gravação recente: id -> True, até REPLICA_STICKY_SECONDS
+escritas_recentes = TTLCache(maxsize=10000, ttl=settings.REPLICA_STICKY_SECONDS)
+
+_rodizio = itertools.cycle(ReplicaSessions) if ReplicaSessions else None
+
+# Instante da última gravação do cliente (segundos desde a época)
+ESCRITA_HEADER = "X-Last-Write"
+ESCRITA_COOKIE = "sk_ultima_escrita"
+METODOS_ESCRITA = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def marcar_escrita(user_id: str) -> None:
+    """Mantém as leituras do usuário no primário pelos próximos segundos"""
+    escritas_recentes.set(user_id, True)
+
+
+@event.listens_for(Session, "after_commit")
+def _marcar_escrita_commit(session):
+    """Commit de uma sessão autenticada (ver get_current_user) marca o usuário"""
+    user_id = session.info.get("user_id")
+    if user_id:
+        marcar_escrita(user_id)
+
+
+async def marcar_escrita_resposta(request: Request, call_next) -> Response:
+    """
+    Middleware: marca as respostas de gravações bem-sucedidas com o instante
+    da escrita (header e cookie), devolvido pelo cliente nas próximas leituras.
+    """
+    response = await call_next(request)
+    if request.method in METODOS_ESCRITA and response.status_code < 400:
+        agora = f"{time.time():.3f}"
+        response.headers[ESCRITA_HEADER] = agora
+        response.set_cookie(
+            ESCRITA_COOKIE,
+            agora,
+            max_age=int(settings.REPLICA_STICKY_SECONDS),
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
+def cliente_gravou(request: Request) -> bool:
+    """
+    Se o cliente informou (header ou cookie) uma gravação dentro da janela.
+    Aceita a mesma folga para instantes no futuro (relógios de outros servidores):
+    um valor forjado só leva as leituras do próprio cliente ao primário.
+    """
+    valor = request.headers.get(ESCRITA_HEADER) or request.cookies.get(ESCRITA_COOKIE)
+    try:
+        idade = time.time() - float(valor)
+    except (TypeError, ValueError):
+        return False
+    janela = int(settings.REPLICA_STICKY_SECONDS)
+    return -janela < idade < janela
+
+
+def le_do_primario(user_id: str, gravou: bool = False) -> bool:
+    """
+    Se as consultas do usuário vão ao primário: sem réplicas, ou se o usuário
+    gravou há pouco (neste processo ou, com gravou, informado pelo cliente).
+    """
+    primario = _rodizio is None or gravou or bool(escritas_recentes.get(user_id))
+    Metrics.incrementar("db.leituras_primario" if primario else "db.leituras_replica")
+    return primario
+
+
+def fabrica_leitura(user_id: str, gravou: bool = False):
+    """
+    Fábrica de sessões para consultas que vivem além da requisição (exportação):
+    de uma réplica, ou do primário (ver le_do_primario).
+    """
+    if le_do_primario(user_id, gravou):
+        return AsyncSessionLocal
+    return next(_rodizio)
+
+
+async def get_db_leitura(
+    request: Request,
+    current_user: Usuario = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Dependency que fornece uma sessão para consultas: a própria sessão get_db da
+    requisição quando a leitura vai ao primário, ou uma sessão de réplica.
+    """
+    if le_do_primario(current_user.id, cliente_gravou(request)):
+        yield db
+        return
+    
+    async with next(_rodizio)() as replica:
+        yield replica
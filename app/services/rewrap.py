@@ -0,0 +1,129 @@
+"""
+Job de Reempacotamento - Regrava valores sensíveis no formato e chave atuais
+
+Percorre os campos sensíveis em lotes (paginação por id) e regrava os
+valores que ainda estão em outro formato de criptografia ou com outra
+chave. Serve tanto para a conversão de formato quanto para a rotação de
+chaves e pode rodar com a aplicação no ar:
+
+    python -m app.cli rewrap --batch-size 500 --checkpoint rewrap.json
+
+Rotação de chave:
+    1. Gere a nova chave (python -m app.cli derivar-chave --id <novo>) e
+       inclua em ENCRYPTION_KEYS, mantendo a chave antiga.
+    2. Aponte ENCRYPTION_PRIMARY_KEY_ID para o novo id e reinicie a aplicação.
+    3. Rode o rewrap. Ao final sem valores ignorados, a chave antiga pode sair.
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app.models.campo_dinamico import CampoDinamico
+from app.services.crypto import CryptoService
+
+
+@dataclass
+class RewrapResultado:
+    """Contadores e posição de uma execução do job"""
+    lidos: int = 0
+    convertidos: int = 0
+    ignorados: int = 0
+    ultimo_id: str = ""
+
+
+class Checkpoint:
+    """
+    Progresso do job salvo em um arquivo JSON após cada lote.
+    Permite retomar a execução de onde parou.
+    """
+    
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+    
+    def carregar(self) -> RewrapResultado:
+        """Lê o progresso salvo (ou começa do zero)"""
+        if not os.path.exists(self.caminho):
+            return RewrapResultado()
+        with open(self.caminho, "r", encoding="utf-8") as f:
+            return RewrapResultado(**json.load(f))
+    
+    def salvar(self, resultado: RewrapResultado) -> None:
+        """Grava o progresso de forma atômica"""
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(asdict(resultado), f)
+        os.replace(temporario, self.caminho)
+
+
+def rewrap_campos(
+    db: Session,
+    batch_size: int = 500,
+    pausa: float = 0.0,
+    criptografar_texto_puro: bool = False,
+    inicio: Optional[RewrapResultado] = None,
+    ao_concluir_lote: Optional[Callable[[RewrapResultado], None]] = None
+) -> RewrapResultado:
+    """
+    Regrava no formato e chave atuais todos os campos sensíveis que precisarem.
+    Cada lote é confirmado separadamente, sem manter a tabela travada, e a
+    memória usada é limitada ao tamanho do lote.
+    
+    Com criptografar_texto_puro, valores sensíveis gravados sem criptografia
+    também são criptografados. Com inicio, retoma a partir do último id
+    processado; ao_concluir_lote é chamado após cada commit.
+    """
+    resultado = inicio or RewrapResultado()
+    tabela = CampoDinamico.__table__
+    
+    # Só grava se o valor não mudou desde a leitura; preserva updated_at,
+    # já que o conteúdo descriptografado continua o mesmo
+    stmt = (
+        update(tabela)
+        .where(tabela.c.id == bindparam("b_id"), tabela.c.value == bindparam("b_antigo"))
+        .values(value=bindparam("b_novo"), updated_at=tabela.c.updated_at)
+    )
+    
+    while True:
+        lote = db.query(CampoDinamico.id, CampoDinamico.value).filter(
+            CampoDinamico.is_sensitive.is_(True),
+            CampoDinamico.value.isnot(None),
+            CampoDinamico.id > resultado.ultimo_id
+        ).order_by(CampoDinamico.id).limit(batch_size).all()
+        
+        if not lote:
+            break
+        
+        resultado.lidos += len(lote)
+        
+        params = []
+        for campo_id, valor in lote:
+            if not CryptoService.needs_rewrap(valor):
+                continue
+            if criptografar_texto_puro and not CryptoService.is_encrypted(valor):
+                novo = CryptoService.encrypt(valor)
+            else:
+                novo = CryptoService.rewrap(valor)
+            if novo is None:
+                # Não abre com nenhuma chave do key ring
+                resultado.ignorados += 1
+                continue
+            params.append({"b_id": campo_id, "b_antigo": valor, "b_novo": novo})
+        
+        if params:
+            db.execute(stmt, params)
+            resultado.convertidos += len(params)
+        db.commit()
+        
+        resultado.ultimo_id = lote[-1].id
+        if ao_concluir_lote:
+            ao_concluir_lote(resultado)
+        
+        if pausa:
+            time.sleep(pausa)
+    
+    return resultado
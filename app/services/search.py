@@ -0,0 +1,208 @@
+"""
+Serviço de Busca - Índice de texto sobre títulos, notas e campos dos itens
+
+SQLite: tabela virtual FTS5 (itens_busca), atualizada a cada gravação de item
+ou campo, com ranking por bm25. PostgreSQL: índices GIN com pg_trgm, que
+atendem o ILIKE com curinga no início. Outros bancos: ILIKE sem índice.
+Valores de campos sensíveis nunca entram no índice.
+"""
+import re
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from app.models.campo_dinamico import CampoDinamico
+from app.models.item_cofre import ItemCofre
+
+FTS_TABLE = "itens_busca"
+
+_SQL_REMOVER = text(
+    f"DELETE FROM {FTS_TABLE} WHERE item_id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+_SQL_INDEXAR = text(f"""
+    INSERT INTO {FTS_TABLE} (item_id, titulo, nota, campos)
+    SELECT i.id, i.titulo, coalesce(i.nota_adicional, ''),
+           coalesce((
+               SELECT group_concat(
+                   c.label || ' ' || CASE WHEN c.is_sensitive = 1 THEN '' ELSE coalesce(c.value, '') END,
+                   ' '
+               )
+               FROM campos_dinamicos c
+               WHERE c.item_id = i.id AND c.deleted_at IS NULL
+           ), '')
+    FROM itens_cofre i
+    WHERE i.id IN :ids AND i.deleted_at IS NULL
+""").bindparams(bindparam("ids", expanding=True))
+
+_PG_INDICES = [
+    "CREATE INDEX IF NOT EXISTS ix_itens_cofre_titulo_trgm "
+    "ON itens_cofre USING gin (titulo gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_itens_cofre_nota_trgm "
+    "ON itens_cofre USING gin (nota_adicional gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_campos_dinamicos_label_trgm "
+    "ON campos_dinamicos USING gin (label gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_campos_dinamicos_value_trgm "
+    "ON campos_dinamicos USING gin (value gin_trgm_ops) WHERE is_sensitive IS NOT TRUE",
+]
+
+
+class SearchService:
+    """
+    Busca de itens do cofre.
+    O modo é definido na subida da aplicação, conforme o banco.
+    """
+    
+    # "fts5", "trgm" ou "ilike"
+    modo: str = "ilike"
+    
+    @classmethod
+    def inicializar(cls, engine: Engine) -> None:
+        """Cria as estruturas de busca do banco e popula o índice, se novo"""
+        dialeto = engine.dialect.name
+        
+        if dialeto == "sqlite":
+            with engine.begin() as conn:
+                existe = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE name = :nome"),
+                    {"nome": FTS_TABLE}
+                ).first()
+                try:
+                    conn.execute(text(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                        "item_id UNINDEXED, titulo, nota, campos, "
+                        "tokenize = 'unicode61 remove_diacritics 2')"
+                    ))
+                except Exception:
+                    # SQLite compilado sem FTS5
+                    return
+            cls.modo = "fts5"
+            if not existe:
+                cls.reindexar_tudo(engine)
+        
+        elif dialeto == "postgresql":
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                    for ddl in _PG_INDICES:
+                        conn.execute(text(ddl))
+            except Exception:
+                # Sem permissão para criar a extensão: segue com ILIKE sem índice
+                return
+            cls.modo = "trgm"
+    
+    @classmethod
+    def reindexar_tudo(cls, engine: Engine, batch_size: int = 1000) -> int:
+        """Reconstrói o índice FTS5 inteiro, em lotes. Retorna o total de itens"""
+        if cls.modo != "fts5":
+            return 0
+        
+        total = 0
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        
+        ultimo_id = ""
+        while True:
+            with engine.begin() as conn:
+                ids = conn.execute(
+                    select(ItemCofre.id)
+                    .where(ItemCofre.id > ultimo_id)
+                    .order_by(ItemCofre.id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                conn.execute(_SQL_INDEXAR, {"ids": ids})
+            ultimo_id = ids[-1]
+            total += len(ids)
+        return total
+    
+    @classmethod
+    def indexar_itens(cls, db: Session, item_ids: Iterable[str]) -> None:
+        """
+        Atualiza o índice dos itens informados na transação da sessão.
+        Itens excluídos (soft delete) saem do índice.
+        """
+        if cls.modo != "fts5":
+            return
+        
+        ids = list(set(item_ids))
+        if not ids:
+            return
+        
+        db.flush()
+        db.execute(_SQL_REMOVER, {"ids": ids})
+        db.execute(_SQL_INDEXAR, {"ids": ids})
+    
+    @staticmethod
+    def _consulta_fts(busca: str) -> Optional[str]:
+        """Monta a expressão MATCH: todos os termos, com busca por prefixo"""
+        termos = re.findall(r"\w+", busca)
+        if not termos:
+            return None
+        return " ".join(f'"{termo}"*' for termo in termos)
+    
+    @staticmethod
+    def _filtro_ilike(busca: str) -> ColumnElement:
+        """Filtro por ILIKE em título, notas, rótulos e valores não sensíveis"""
+        padrao = f"%{busca}%"
+        return or_(
+            ItemCofre.titulo.ilike(padrao),
+            ItemCofre.nota_adicional.ilike(padrao),
+            ItemCofre.campos.any(and_(
+                CampoDinamico.deleted_at.is_(None),
+                or_(
+                    CampoDinamico.label.ilike(padrao),
+                    and_(
+                        CampoDinamico.is_sensitive.isnot(True),
+                        CampoDinamico.value.ilike(padrao)
+                    )
+                )
+            ))
+        )
+    
+    @classmethod
+    def _subquery_fts(cls, consulta: str):
+        """Ids e relevância (bm25, menor é melhor) dos itens que casam com a busca"""
+        return select(
+            literal_column("item_id").label("item_id"),
+            literal_column(f"bm25({FTS_TABLE}, 0.0, 10.0, 2.0, 1.0)").label("rank")
+        ).select_from(text(FTS_TABLE)).where(
+            literal_column(FTS_TABLE).match(consulta)
+        ).subquery()
+    
+    @classmethod
+    def filtrar(cls, query, busca: str):
+        """
+        Restringe uma consulta de ItemCofre aos itens que casam com a busca.
+        No FTS5 a consulta parte do índice (JOIN), não da tabela de itens.
+        """
+        consulta = cls._consulta_fts(busca) if cls.modo == "fts5" else None
+        if consulta is None:
+            return query.filter(cls._filtro_ilike(busca))
+        
+        sub = cls._subquery_fts(consulta)
+        return query.join(sub, sub.c.item_id == ItemCofre.id)
+    
+    @classmethod
+    def ranking(cls, query, busca: str) -> Tuple[object, ColumnElement]:
+        """
+        Aplica a busca a uma consulta de ItemCofre.
+        Retorna a consulta filtrada e a expressão de ordenação por relevância.
+        """
+        consulta = cls._consulta_fts(busca) if cls.modo == "fts5" else None
+        if consulta is not None:
+            sub = cls._subquery_fts(consulta)
+            return query.join(sub, sub.c.item_id == ItemCofre.id), sub.c.rank.asc()
+        
+        query = query.filter(cls._filtro_ilike(busca))
+        if cls.modo == "trgm":
+            relevancia = func.greatest(
+                func.similarity(ItemCofre.titulo, busca),
+                func.similarity(func.coalesce(ItemCofre.nota_adicional, ""), busca)
+            )
+            return query, relevancia.desc()
+        return query, ItemCofre.titulo.asc()
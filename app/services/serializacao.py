@@ -0,0 +1,149 @@
+"""
+Serviço de Serialização - JSON das listagens de itens sem validar cada objeto
+
+Com response_model, o FastAPI valida cada item, campo e categoria pelo Pydantic
+(from_attributes) antes de gerar o JSON. Nas páginas de itens, esse é o maior
+custo de CPU da resposta. O modo "fast" (ITENS_SERIALIZER) monta os dicionários
+direto dos objetos carregados, com a lista de atributos de cada schema lida uma
+vez, e gera o JSON com orjson (se instalado) ou com o encoder do pydantic-core.
+As rotas continuam declarando response_model: o schema do OpenAPI não muda.
+
+Nos dois modos, o JSON é gerado no threadpool das rotas, fora do event loop:
+uma página grande não atrasa as demais requisições.
+"""
+from datetime import date, datetime
+from enum import Enum
+from types import UnionType
+from typing import Any, Callable, Iterable, List, Optional, Type, Union, get_args, get_origin
+
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from app.config import get_settings
+from app.schemas.campo_dinamico import CampoDinamicoResponse
+from app.schemas.categoria import CategoriaResponse
+from app.schemas.item_cofre import ItemCofreCompleto
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+settings = get_settings()
+
+Conversor = Callable[[Any], dict]
+
+
+def _padrao(valor: Any) -> Any:
+    """Tipos que o encoder JSON não conhece (datas no formato ISO do Pydantic)"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Enum):
+        return valor.value
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def dumps(dados: Any) -> bytes:
+    """JSON compacto em bytes (orjson se disponível)"""
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+    return to_json(dados, fallback=_padrao)
+
+
+def _coercao(anotacao: Any) -> Optional[Callable[[Any], Any]]:
+    """
+    Conversão para o tipo declarado no schema, onde o valor do banco pode divergir:
+    bool (colunas anuláveis, como favorito e is_sensitive) e Enum (valor do membro).
+    Em campos Optional, None passa sem conversão. None se não houver o que converter.
+    """
+    tipo, opcional = anotacao, False
+    if get_origin(tipo) in (Union, UnionType):
+        argumentos = [arg for arg in get_args(tipo) if arg is not type(None)]
+        opcional = len(argumentos) < len(get_args(tipo))
+        tipo = argumentos[0] if len(argumentos) == 1 else None
+    
+    if tipo is bool:
+        converter = bool
+    elif isinstance(tipo, type) and issubclass(tipo, Enum):
+        converter = lambda valor, enum=tipo: enum(valor).value
+    else:
+        return None
+    
+    if opcional:
+        return lambda valor: None if valor is None else converter(valor)
+    return converter
+
+
+def conversor(modelo: Type[BaseModel], **aninhados: Conversor) -> Conversor:
+    """
+    Converte um objeto no dicionário do schema, na ordem dos campos do modelo.
+    Atributos ausentes no objeto assumem o padrão do schema; os aninhados
+    (quando não nulos) passam pelo conversor informado; bool e Enum são
+    convertidos para o tipo do schema (ver _coercao).
+    """
+    campos = tuple(
+        (
+            nome,
+            info.get_default(call_default_factory=True),
+            aninhados.get(nome),
+            _coercao(info.annotation)
+        )
+        for nome, info in modelo.model_fields.items()
+    )
+    
+    def converter(obj: Any) -> dict:
+        dados = {}
+        for nome, padrao, aninhado, coagir in campos:
+            valor = getattr(obj, nome, padrao)
+            if aninhado is not None:
+                valor = aninhado(valor) if valor is not None else valor
+            elif coagir is not None:
+                valor = coagir(valor)
+            dados[nome] = valor
+        return dados
+    
+    return converter
+
+
+def lista(converter: Conversor) -> Conversor:
+    """Conversor de uma lista de objetos"""
+    return lambda objetos: [converter(obj) for obj in objetos]
+
+
+campo_dict = conversor(CampoDinamicoResponse)
+categoria_dict = conversor(CategoriaResponse)
+item_dict = conversor(ItemCofreCompleto, campos=lista(campo_dict), categoria=categoria_dict)
+
+_itens_pydantic = TypeAdapter(List[ItemCofreCompleto])
+
+
+class Serializador:
+    """JSON das páginas de itens, no modo configurado"""
+    
+    @staticmethod
+    def rapido() -> bool:
+        """Se as listagens usam o caminho sem validação"""
+        return settings.ITENS_SERIALIZER == "fast"
+    
+    @classmethod
+    def itens(cls, itens: Iterable) -> bytes:
+        """JSON de uma lista de itens (List[ItemCofreCompleto])"""
+        if cls.rapido():
+            return dumps([item_dict(item) for item in itens])
+        return _itens_pydantic.dump_json(_itens_pydantic.validate_python(itens, from_attributes=True))
+    
+    @classmethod
+    async def itens_async(cls, itens: list) -> bytes:
+        """JSON de uma lista de itens, gerado fora do event loop"""
+        return await run_in_threadpool(cls.itens, itens)
+    
+    @classmethod
+    async def responder_itens(cls, itens: list, response: Optional[Response] = None) -> Response:
+        """
+        Resposta de uma rota de listagem de itens: o JSON já pronto (no modo
+        configurado), com os headers definidos na rota.
+        """
+        headers = dict(response.headers) if response is not None else None
+        return Response(content=await cls.itens_async(itens), media_type="application/json", headers=headers)
@@ -0,0 +1,167 @@
+"""
+Serviço de Sincronização - Alterações do cofre desde a última sincronização do cliente
+
+O token de sincronização guarda o instante da consulta (menos uma margem,
+SYNC_OVERLAP_SECONDS, para transações que gravaram antes e confirmaram depois).
+Cada consulta de alterações filtra por updated_at em um índice que começa pelo
+usuário: o custo acompanha o volume de alterações, não o tamanho do cofre.
+Alterações dentro da margem podem voltar na sincronização seguinte; o cliente
+aplica o resultado por id, então repetir um item não tem efeito.
+
+Campos dinâmicos não são consultados à parte: toda gravação de campo
+atualiza o updated_at do item (tocar_itens), que volta completo.
+
+A primeira sincronização (sem token) é paginada pela rota: a marca é fixada
+na primeira página e segue no cursor, e o token só vem na última. O que mudar
+durante a paginação tem updated_at posterior à marca e volta na sincronização
+seguinte.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.item_cofre import ItemCofre
+from app.models.permissao import Permissao
+from app.services.pagination import decode_cursor, encode_cursor
+
+settings = get_settings()
+
+
+@dataclass
+class Alteracoes:
+    """Ids alterados desde o token e o próximo token"""
+    sync_token: str
+    itens: Set[str] = field(default_factory=set)
+    itens_removidos: Set[str] = field(default_factory=set)
+    permissoes: List[Permissao] = field(default_factory=list)
+    permissoes_removidas: List[str] = field(default_factory=list)
+
+
+class SyncService:
+    """Serviço de sincronização incremental"""
+    
+    @staticmethod
+    def gerar_token(marca: datetime) -> str:
+        """Token opaco a partir do instante da sincronização"""
+        return encode_cursor([marca.isoformat()])
+    
+    @staticmethod
+    def ler_token(token: str) -> datetime:
+        """
+        Instante guardado no token.
+        Lança 400 se o token for inválido.
+        """
+        try:
+            (marca,) = decode_cursor(token, str)
+            return datetime.fromisoformat(marca)
+        except (HTTPException, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token de sincronização inválido"
+            )
+    
+    @staticmethod
+    def marca_atual() -> datetime:
+        """Instante do próximo token: agora, menos a margem de gravações atrasadas"""
+        return datetime.utcnow() - timedelta(seconds=int(settings.SYNC_OVERLAP_SECONDS))
+    
+    @staticmethod
+    async def tocar_itens(db: AsyncSession, item_ids: Iterable[str]) -> None:
+        """Marca os itens como alterados (ex.: gravação em um campo do item)"""
+        item_ids = list(item_ids)
+        if item_ids:
+            await db.execute(
+                update(ItemCofre)
+                .where(ItemCofre.id.in_(item_ids))
+                .values(updated_at=datetime.utcnow())
+            )
+    
+    @classmethod
+    async def alteracoes(
+        cls,
+        db: AsyncSession,
+        user_id: str,
+        desde: Optional[datetime] = None
+    ) -> Alteracoes:
+        """
+        Itens e permissões alterados desde o instante informado.
+        Sem instante, é a sincronização completa: tudo o que está ativo.
+        """
+        # A marca vem antes das consultas: o que for gravado durante elas volta na próxima
+        marca = cls.marca_atual()
+        resultado = Alteracoes(sync_token=cls.gerar_token(marca))
+        
+        def desde_o_token(modelo):
+            if desde is None:
+                return modelo.deleted_at.is_(None)
+            return modelo.updated_at > desde
+        
+        def separar(rows, alterados: Set[str], removidos: Set[str]):
+            for id_, deleted_at in rows:
+                (removidos if deleted_at else alterados).add(id_)
+        
+        recebidos = select(Permissao.item_id).where(
+            Permissao.shared_with_user_id == user_id,
+            Permissao.deleted_at.is_(None)
+        )
+        
+        # Itens próprios (ix_itens_cofre_user_updated)
+        separar(await db.execute(
+            select(ItemCofre.id, ItemCofre.deleted_at).where(
+                ItemCofre.user_id == user_id,
+                desde_o_token(ItemCofre)
+            )
+        ), resultado.itens, resultado.itens_removidos)
+        
+        # Itens compartilhados com o usuário
+        separar(await db.execute(
+            select(ItemCofre.id, ItemCofre.deleted_at).where(
+                ItemCofre.id.in_(recebidos),
+                desde_o_token(ItemCofre)
+            )
+        ), resultado.itens, resultado.itens_removidos)
+        
+        # Compartilhamentos recebidos: novos, com nível alterado ou revogados
+        # (ix_permissoes_destino_updated)
+        separar(await db.execute(
+            select(Permissao.item_id, Permissao.deleted_at).where(
+                Permissao.shared_with_user_id == user_id,
+                desde_o_token(Permissao)
+            )
+        ), resultado.itens, resultado.itens_removidos)
+        
+        resultado.permissoes, resultado.permissoes_removidas = await cls.permissoes(db, user_id, desde)
+        return resultado
+    
+    @staticmethod
+    async def permissoes(
+        db: AsyncSession,
+        user_id: str,
+        desde: Optional[datetime] = None
+    ) -> Tuple[List[Permissao], List[str]]:
+        """
+        Compartilhamentos dos itens do usuário alterados desde o instante
+        (ix_permissoes_updated) e ids dos revogados. Sem instante, os ativos.
+        """
+        if desde is None:
+            filtros = [Permissao.deleted_at.is_(None), ItemCofre.deleted_at.is_(None)]
+        else:
+            filtros = [Permissao.updated_at > desde]
+        
+        ativas, removidas = [], []
+        for permissao in (await db.scalars(
+            select(Permissao)
+            .join(ItemCofre, ItemCofre.id == Permissao.item_id)
+            .where(ItemCofre.user_id == user_id, *filtros)
+            .order_by(Permissao.updated_at)
+        )).all():
+            if permissao.deleted_at:
+                removidas.append(permissao.id)
+            else:
+                ativas.append(permissao)
+        return ativas, removidas
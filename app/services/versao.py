@@ -0,0 +1,146 @@
+"""
+Serviço de Versão - Versão do cofre de cada usuário, para ETags e sincronização
+
+A versão resume, em uma única consulta, o maior updated_at e a quantidade de
+registros ativos de tudo o que compõe a resposta (itens, campos, permissões,
+categorias e donos dos itens compartilhados). Qualquer gravação muda a versão:
+inclusões e alterações aumentam o maior updated_at, exclusões mudam a quantidade.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.campo_dinamico import CampoDinamico
+from app.models.categoria import Categoria
+from app.models.item_cofre import ItemCofre
+from app.models.permissao import Permissao
+from app.models.usuario import Usuario
+
+
+def _agregados(modelo, *filtros) -> list:
+    """Maior updated_at e quantidade dos registros ativos, como subconsultas"""
+    filtros = (*filtros, modelo.deleted_at.is_(None))
+    return [
+        select(func.max(modelo.updated_at)).where(*filtros).scalar_subquery(),
+        select(func.count()).select_from(modelo).where(*filtros).scalar_subquery(),
+    ]
+
+
+def _resumo(valores: Iterable) -> str:
+    """Versão a partir dos valores agregados"""
+    return hashlib.sha256(repr(tuple(valores)).encode()).hexdigest()[:32]
+
+
+class VersaoCofre:
+    """Versões do cofre, consultadas antes de carregar ou descriptografar qualquer item"""
+    
+    @staticmethod
+    def _compartilhados(user_id: str):
+        """Ids dos itens compartilhados com o usuário"""
+        return select(Permissao.item_id).where(
+            Permissao.shared_with_user_id == user_id,
+            Permissao.deleted_at.is_(None)
+        )
+    
+    @classmethod
+    async def itens(cls, db: AsyncSession, user_id: str) -> str:
+        """Versão da lista de itens do usuário (próprios e compartilhados)"""
+        compartilhados = cls._compartilhados(user_id)
+        acessiveis = or_(ItemCofre.user_id == user_id, ItemCofre.id.in_(compartilhados))
+        ids_acessiveis = select(ItemCofre.id).where(acessiveis, ItemCofre.deleted_at.is_(None))
+        
+        valores = (await db.execute(select(
+            *_agregados(ItemCofre, acessiveis),
+            *_agregados(CampoDinamico, CampoDinamico.item_id.in_(ids_acessiveis)),
+            *_agregados(Permissao, Permissao.shared_with_user_id == user_id),
+            *_agregados(Categoria, or_(
+                Categoria.usuario_id.is_(None),
+                Categoria.usuario_id == user_id,
+                Categoria.id.in_(select(ItemCofre.category_id).where(
+                    acessiveis, ItemCofre.deleted_at.is_(None)
+                ))
+            )),
+            *_agregados(Usuario, Usuario.id.in_(
+                select(ItemCofre.user_id).where(ItemCofre.id.in_(compartilhados))
+            )),
+        ))).one()
+        return _resumo(valores)
+    
+    @classmethod
+    async def item(cls, db: AsyncSession, item_id: str, user_id: str) -> Optional[str]:
+        """
+        Versão de um item: o próprio item, seus campos, categoria, dono e o acesso do usuário.
+        None se o item não existir (ou estiver excluído).
+        """
+        valores = (await db.execute(select(
+            *_agregados(ItemCofre, ItemCofre.id == item_id),
+            *_agregados(CampoDinamico, CampoDinamico.item_id == item_id),
+            *_agregados(Permissao, Permissao.item_id == item_id, Permissao.shared_with_user_id == user_id),
+            *_agregados(Categoria, Categoria.id.in_(
+                select(ItemCofre.category_id).where(ItemCofre.id == item_id)
+            )),
+            *_agregados(Usuario, Usuario.id.in_(
+                select(ItemCofre.user_id).where(ItemCofre.id == item_id)
+            )),
+        ))).one()
+        
+        # Quantidade de itens ativos com o id (segundo agregado)
+        if not valores[1]:
+            return None
+        return _resumo((user_id, *valores))
+    
+    @classmethod
+    async def categorias(cls, db: AsyncSession, user_id: str) -> str:
+        """Versão da lista de categorias (globais e do usuário)"""
+        valores = (await db.execute(select(
+            *_agregados(Categoria, or_(
+                Categoria.usuario_id.is_(None),
+                Categoria.usuario_id == user_id
+            )),
+        ))).one()
+        return _resumo(valores)
+
+
+def gerar_etag(versao: str, variante: Optional[str] = None) -> str:
+    """
+    ETag fraco da resposta: a versão e, se houver, o que muda o conteúdo
+    para a mesma versão (ex.: a query string de filtros e paginação).
+    """
+    if variante:
+        versao = hashlib.sha256(f"{versao}|{variante}".encode()).hexdigest()[:32]
+    return f'W/"{versao}"'
+
+
+def etag_confere(request: Request, etag: str) -> bool:
+    """
+    Se o If-None-Match da requisição contém o ETag (comparação fraca).
+    "*" confere com qualquer versão: só use depois de confirmar que o recurso
+    existe e que o usuário tem acesso a ele.
+    """
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    if cabecalho.strip() == "*":
+        return True
+    
+    valor = etag.removeprefix("W/")
+    return any(
+        candidato.strip().removeprefix("W/") == valor
+        for candidato in cabecalho.split(",")
+    )
+
+
+def nao_modificado(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Define o ETag da resposta (revalidada a cada uso pelo cliente).
+    Se o cliente já tem essa versão, retorna a resposta 304 a ser devolvida.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_confere(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    response.headers.update(headers)
+    return None
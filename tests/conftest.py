@@ -0,0 +1,60 @@
+"""
+Fixtures dos testes: a aplicação sobre um banco SQLite temporário
+
+As variáveis de ambiente são definidas antes de importar o app
+(as configurações são lidas uma vez, em get_settings).
+"""
+import os
+import tempfile
+
+_pasta = tempfile.mkdtemp(prefix="security-key-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_pasta, 'testes.db')}"
+os.environ.setdefault("SECRET_KEY", "chave-de-teste-" + "x" * 32)
+os.environ.setdefault("ENCRYPTION_KEY", "cifra-de-teste-" + "k" * 32)
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import async_engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Cliente HTTP da aplicação (startup e shutdown uma vez por sessão)"""
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def banco() -> str:
+    """Caminho do arquivo SQLite usado pela aplicação"""
+    return os.path.join(_pasta, "testes.db")
+
+
+@pytest.fixture
+def registrar(client):
+    """Registra um usuário e devolve os headers de autenticação e o id"""
+    def _registrar(nome: str, email: str):
+        r = client.post("/api/auth/registro", json={"nome": nome, "email": email, "password": "senha123"})
+        assert r.status_code == 201, r.text
+        r = client.post("/api/auth/login", data={"username": email, "password": "senha123"})
+        assert r.status_code == 200, r.text
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        return headers, client.get("/api/auth/me", headers=headers).json()["id"]
+    return _registrar
+
+
+@pytest.fixture
+def consultas():
+    """Lista das consultas (SQL, parâmetros) executadas pela aplicação durante o teste"""
+    executadas = []
+    
+    def registrar_consulta(conn, cursor, statement, parameters, context, executemany):
+        executadas.append((statement, parameters))
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", registrar_consulta)
+    yield executadas
+    event.remove(async_engine.sync_engine, "before_cursor_execute", registrar_consulta)
@@ -0,0 +1,38 @@
+"""
+Cache de usuários autenticados: gravações em Usuario invalidam a entrada após o commit
+"""
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models.usuario import Usuario
+from app.services.auth import user_cache
+
+
+def test_invalidacao_apos_o_commit(client, registrar):
+    headers, user_id = registrar("Cache Usuario", "cache.usuario@x.com")
+    client.get("/api/auth/me", headers=headers)
+    assert user_cache.get(user_id) is not None
+
+    # Pelo ORM: o flush não descarta; o commit sim
+    with SessionLocal() as db:
+        db.get(Usuario, user_id).nome = "Cache Alterado"
+        db.flush()
+        assert user_cache.get(user_id) is not None
+        db.commit()
+    assert user_cache.get(user_id) is None
+    assert client.get("/api/auth/me", headers=headers).json()["nome"] == "Cache Alterado"
+
+    # Gravação desfeita: a entrada continua válida
+    with SessionLocal() as db:
+        db.get(Usuario, user_id).nome = "Desfeito"
+        db.flush()
+        db.rollback()
+    assert user_cache.get(user_id) is not None
+
+    # update() em lote, sem objetos na sessão
+    with SessionLocal() as db:
+        db.execute(update(Usuario).where(Usuario.id == user_id).values(is_active=False))
+        assert user_cache.get(user_id) is not None
+        db.commit()
+    assert user_cache.get(user_id) is None
+    assert client.get("/api/auth/me", headers=headers).status_code == 403
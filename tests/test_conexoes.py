@@ -0,0 +1,111 @@
+"""
+Conexões por requisição: uma requisição não ocupa duas conexões do pool do primário
+
+Com o pool esgotado por requisições que esperam uma segunda conexão, as
+requisições concorrentes esbarram em pool_timeout (ou travam com um pool de 1).
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, engine_assincrono, estatisticas_pool
+from app.services.acl import AclService
+from app.services.auth import user_cache
+
+CONCORRENTES = 40
+
+
+@pytest.fixture
+def pool_restrito(client, monkeypatch, banco):
+    """Troca o pool do primário por um de `tamanho` conexões, sem overflow e com espera curta"""
+    settings = get_settings()
+    original = AsyncSessionLocal.kw["bind"]
+    criados = []
+    
+    def _pool(tamanho: int):
+        monkeypatch.setattr(settings, "DB_POOL_SIZE", tamanho)
+        monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 0)
+        monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 2)
+        pequeno = engine_assincrono(f"sqlite+aiosqlite:///{banco}")
+        AsyncSessionLocal.configure(bind=pequeno)
+        criados.append(pequeno)
+        return pequeno
+    
+    yield _pool
+    AsyncSessionLocal.configure(bind=original)
+    for pequeno in criados:
+        client.portal.call(pequeno.dispose)
+
+
+def checkouts(pool) -> int:
+    """Conexões já retiradas do pool"""
+    return estatisticas_pool(pool.sync_engine)["checkouts"]
+
+
+def test_leituras_concorrentes_sem_esgotar_o_pool(client, registrar, pool_restrito):
+    dono, _ = registrar("Dona", "dona.concorrente@teste.com")
+    headers, user_id = registrar("Concorrente", "concorrente@teste.com")
+    r = client.post("/api/itens", json={"titulo": "Item", "tipo": "login"}, headers=dono)
+    assert r.status_code == 201, r.text
+    item_id = r.json()["id"]
+    r = client.post("/api/permissoes", headers=dono, json={
+        "item_id": item_id, "shared_with_user_id": user_id, "nivel_acesso": "visualizar"
+    })
+    assert r.status_code == 201, r.text
+
+    # Caches frios: get_current_user e o mapa de acesso consultam na sessão da requisição
+    pool = pool_restrito(2)
+    user_cache.clear()
+    AclService.invalidar_usuarios([user_id])
+    antes = checkouts(pool)
+
+    rotas = ["/api/itens", f"/api/itens/{item_id}"] * (CONCORRENTES // 2)
+    with ThreadPoolExecutor(CONCORRENTES) as executor:
+        respostas = list(executor.map(lambda rota: client.get(rota, headers=headers), rotas))
+
+    assert [r.status_code for r in respostas] == [200] * CONCORRENTES
+    assert estatisticas_pool(pool.sync_engine)["wait_timeouts"] == 0
+    # Uma conexão por requisição: leituras via get_db_leitura e o mapa de acesso
+    # usam a sessão get_db da requisição
+    assert checkouts(pool) - antes == CONCORRENTES
+
+
+def test_uma_conexao_por_requisicao(client, registrar, pool_restrito):
+    """
+    Com um pool de uma conexão, nenhuma rota pede uma segunda conexão enquanto
+    segura a primeira (esperaria até pool_timeout). Leituras usam uma só.
+    Gravações pegam de novo a conexão depois do commit, para reler o item,
+    e a exportação lê em uma sessão própria depois de devolver a da requisição.
+    """
+    headers, _ = registrar("Uma Conexao", "uma.conexao@teste.com")
+    r = client.post("/api/itens", headers=headers, json={
+        "titulo": "Conexao", "campos": [{"label": "Senha", "value": "x", "is_sensitive": True}]
+    })
+    assert r.status_code == 201, r.text
+    item_id = r.json()["id"]
+    
+    leituras = [
+        "/api/itens", "/api/itens/versao", "/api/itens/sync", "/api/itens/busca?q=conexao",
+        "/api/itens/compartilhados", f"/api/itens/{item_id}", f"/api/itens/{item_id}/campos",
+        "/api/usuarios", "/api/auth/me", f"/api/permissoes/item/{item_id}",
+    ]
+    outras = [
+        ("GET", "/api/itens/export", None),
+        ("POST", f"/api/itens/{item_id}/favorito", None),
+        ("PUT", f"/api/itens/{item_id}", {"titulo": "Conexao 2"}),
+        ("POST", f"/api/itens/{item_id}/campos", {"label": "PIN", "value": "1"}),
+    ]
+    pool = pool_restrito(1)
+    for rota in leituras:
+        user_cache.clear()  # get_current_user também consulta
+        antes = checkouts(pool)
+        r = client.get(rota, headers=headers)
+        assert r.status_code == 200, (rota, r.text)
+        assert checkouts(pool) - antes == 1, rota
+    
+    for metodo, rota, corpo in outras:
+        user_cache.clear()
+        r = client.request(metodo, rota, headers=headers, json=corpo)
+        assert r.status_code < 400, (rota, r.text)
+    assert estatisticas_pool(pool.sync_engine)["wait_timeouts"] == 0
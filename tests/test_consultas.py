@@ -0,0 +1,149 @@
+"""
+Regressões de acesso ao banco: quantidade de consultas por requisição
+e planos de execução (EXPLAIN QUERY PLAN) das consultas das rotas
+"""
+import re
+import sqlite3
+
+from app.services.cache_categorias import CacheCategorias
+from app.services.metrics import Metrics
+
+# Tabelas que nunca devem ser lidas por inteiro em uma requisição
+TABELAS = ("itens_cofre", "permissoes", "campos_dinamicos", "categorias", "usuarios")
+VARREDURA = re.compile(rf"^SCAN ({'|'.join(TABELAS)})$")
+
+
+def criar_itens(client, headers, quantidade: int, prefixo: str):
+    """Cria itens com um campo sensível e um comum; devolve os ids"""
+    ids = []
+    for i in range(quantidade):
+        r = client.post("/api/itens", headers=headers, json={
+            "titulo": f"{prefixo} {i}",
+            "campos": [
+                {"label": "Usuário", "value": f"user{i}"},
+                {"label": "Senha", "value": f"senha{i}", "is_sensitive": True}
+            ]
+        })
+        assert r.status_code == 201, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_acesso_compartilhado_decidido_pela_memoria(client, registrar):
+    """
+    Depois da primeira decisão, acessos por compartilhamento e ids já negados
+    não consultam o banco; revogar vale na hora neste processo.
+    """
+    dono_headers, _ = registrar("Dono Acl", "dono.acl@x.com")
+    headers, user_id = registrar("Destino Acl", "destino.acl@x.com")
+    (item_id,) = criar_itens(client, dono_headers, 1, "Acl")
+    r = client.post("/api/permissoes", headers=dono_headers, json={
+        "item_id": item_id, "shared_with_user_id": user_id, "nivel_acesso": "visualizar"
+    })
+    assert r.status_code == 201, r.text
+    permissao_id = r.json()["id"]
+    
+    rotas = [f"/api/itens/{item_id}/campos", "/api/itens/inexistente/campos"]
+    for rota in rotas:
+        client.get(rota, headers=headers)
+    
+    antes = Metrics.snapshot()
+    for _ in range(5):
+        assert client.get(rotas[0], headers=headers).status_code == 200
+        assert client.get(rotas[1], headers=headers).status_code == 403
+    depois = Metrics.snapshot()
+    for nome in ("acl.load", "acl.check"):
+        assert depois.get(nome, 0) == antes.get(nome, 0), nome
+    
+    r = client.delete(f"/api/permissoes/{permissao_id}", headers=dono_headers)
+    assert r.status_code == 204
+    assert client.get(rotas[0], headers=headers).status_code == 403
+
+
+def test_listar_itens_quantidade_fixa_de_consultas(client, registrar, consultas):
+    """
+    A listagem não cresce em consultas com o número de itens ou compartilhamentos:
+    os itens vêm com o nível de acesso em um único SELECT (LEFT JOIN na permissão).
+    """
+    headers, dona_id = registrar("Dona Consultas", "dona.consultas@x.com")
+    outro_headers, _ = registrar("Outro Consultas", "outro.consultas@x.com")
+    criar_itens(client, headers, 2, "Poucos")
+    client.get("/api/itens", headers=headers)  # aquece os caches do usuário
+    
+    consultas.clear()
+    r = client.get("/api/itens", headers=headers)
+    assert r.status_code == 200 and len(r.json()) == 2
+    com_poucos = len(consultas)
+    
+    # Mais itens próprios e compartilhados
+    for item_id in criar_itens(client, outro_headers, 5, "Recebido"):
+        r = client.post("/api/permissoes", headers=outro_headers, json={
+            "item_id": item_id, "shared_with_user_id": dona_id, "nivel_acesso": "visualizar"
+        })
+        assert r.status_code == 201, r.text
+    criar_itens(client, headers, 20, "Muitos")
+    client.get("/api/itens?limit=100", headers=headers)
+    
+    consultas.clear()
+    r = client.get("/api/itens?limit=100", headers=headers)
+    assert r.status_code == 200 and len(r.json()) == 27
+    assert len(consultas) == com_poucos, [sql for sql, _ in consultas]
+    
+    # Um único SELECT dos itens, já com o nível de acesso da permissão
+    listagens = [sql for sql, _ in consultas if "permissoes.nivel_acesso" in sql]
+    assert len(listagens) == 1 and "LEFT OUTER JOIN permissoes" in listagens[0]
+    
+    # Os valores sensíveis voltam abertos, sem consultas extras por item
+    recebidos = [item for item in r.json() if item["titulo"].startswith("Recebido")]
+    assert len(recebidos) == 5 and not any(item["pode_editar"] for item in recebidos)
+    senhas = [campo["value"] for item in r.json() for campo in item["campos"] if campo["label"] == "Senha"]
+    assert all(senha.startswith("senha") for senha in senhas)
+
+
+def planos(banco: str, consultas) -> list:
+    """Linhas do EXPLAIN QUERY PLAN de cada SELECT registrado"""
+    with sqlite3.connect(banco) as conexao:
+        return [
+            (sql, [linha[3] for linha in conexao.execute(f"EXPLAIN QUERY PLAN {sql}", parametros)])
+            for sql, parametros in consultas
+            if sql.lstrip().upper().startswith("SELECT")
+        ]
+
+
+def test_rotas_sem_varredura_completa(client, registrar, consultas, banco):
+    """
+    Nenhuma consulta das rotas de leitura varre uma tabela inteira, e os índices
+    parciais dos registros ativos (deleted_at IS NULL) atendem os filtros das rotas.
+    """
+    headers, dono_id = registrar("Dona Planos", "dona.planos@x.com")
+    outro_headers, _ = registrar("Outro Planos", "outro.planos@x.com")
+    (proprio,) = criar_itens(client, headers, 1, "Plano")
+    (recebido,) = criar_itens(client, outro_headers, 1, "Recebido")
+    r = client.post("/api/permissoes", headers=outro_headers, json={
+        "item_id": recebido, "shared_with_user_id": dono_id, "nivel_acesso": "editar"
+    })
+    assert r.status_code == 201, r.text
+    
+    indices_esperados = {
+        "/api/itens": "ix_permissoes_destino_ativas",
+        "/api/itens/compartilhados": None,
+        f"/api/itens/{recebido}": "ix_permissoes_destino_ativas",
+        f"/api/itens/{proprio}/campos": "ix_campos_dinamicos_item_ativos",
+        "/api/itens/sync": "ix_permissoes_destino_ativas",
+        "/api/usuarios": "ix_usuarios_nome_ativos",
+        "/api/categorias": "ix_categorias_usuario_ativas",
+    }
+    for rota, indice in indices_esperados.items():
+        client.get(rota, headers=headers)  # aquece os caches: mede as consultas da própria rota
+        # A lista de categorias fica em memória: descartada para que a consulta apareça
+        CacheCategorias.recarregar_globais()
+        consultas.clear()
+        r = client.get(rota, headers=headers)
+        assert r.status_code == 200, (rota, r.text)
+        
+        executados = planos(banco, consultas)
+        assert executados, rota
+        for sql, plano in executados:
+            assert not any(VARREDURA.match(linha) for linha in plano), (rota, sql, plano)
+        if indice:
+            assert any(indice in linha for _, plano in executados for linha in plano), (rota, executados)
@@ -16,6 +16,7 @@ CREATE TABLE IF NOT EXISTS "campos_dinamicos" (
 CREATE TABLE IF NOT EXISTS "categorias" (
 	"id"	VARCHAR(36) NOT NULL,
 	"nome"	VARCHAR(100) NOT NULL,
+	"usuario_id"	VARCHAR(36),
 	"icone"	VARCHAR(50),
 	"descricao"	VARCHAR(255),
 	"cor"	VARCHAR(7),
@@ -23,7 +24,8 @@ CREATE TABLE IF NOT EXISTS "categorias" (
 	"updated_at"	DATETIME NOT NULL,
 	"deleted_at"	DATETIME,
 	PRIMARY KEY("id"),
-	UNIQUE("nome")
+	UNIQUE("nome"),
+	FOREIGN KEY("usuario_id") REFERENCES "usuarios"("id")
 );
 CREATE TABLE IF NOT EXISTS "itens_cofre" (
 	"id"	VARCHAR(36) NOT NULL,
@@ -80,4 +82,36 @@ CREATE INDEX IF NOT EXISTS "ix_permissoes_shared_with_user_id" ON "permissoes" (
 CREATE UNIQUE INDEX IF NOT EXISTS "ix_usuarios_email" ON "usuarios" (
 	"email"
 );
+CREATE INDEX IF NOT EXISTS "ix_itens_cofre_user_ativos" ON "itens_cofre" (
+	"user_id",
+	"favorito",
+	"titulo"
+) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS "ix_permissoes_destino_ativas" ON "permissoes" (
+	"shared_with_user_id",
+	"item_id"
+) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS "ix_campos_dinamicos_item_ativos" ON "campos_dinamicos" (
+	"item_id",
+	"ordem"
+) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS "ix_categorias_usuario_ativas" ON "categorias" (
+	"usuario_id",
+	"nome"
+) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS "ix_usuarios_nome_ativos" ON "usuarios" (
+	"nome",
+	"id"
+) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS "ix_itens_cofre_user_updated" ON "itens_cofre" (
+	"user_id",
+	"updated_at"
+);
+CREATE INDEX IF NOT EXISTS "ix_permissoes_destino_updated" ON "permissoes" (
+	"shared_with_user_id",
+	"updated_at"
+);
+CREATE INDEX IF NOT EXISTS "ix_permissoes_updated" ON "permissoes" (
+	"updated_at"
+);
 COMMIT;